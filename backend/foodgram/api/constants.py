@@ -0,0 +1,5 @@
+RECIPES_LIMIT_DEFAULT = 10
+PAGINATION_MODE_QUERY_PARAM = 'pagination'
+CURSOR_PAGINATION_MODE = 'cursor'
+BULK_RECIPES_MAX_SIZE = 100
+POPULAR_ORDERING = 'popular'
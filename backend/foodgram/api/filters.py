@@ -1,7 +1,11 @@
 from django.contrib.auth import get_user_model
 from django_filters.rest_framework import FilterSet, filters
 
-from recipes.models import Ingredients, Recipe, Tag
+from recipes.models import Favorite, Ingredients, Recipe, ShoppingCart
+from recipes.search import search_recipes
+from recipes.tag_slugs import get_tag_choices, tag_slugs
+
+from .constants import POPULAR_ORDERING
 
 User = get_user_model()
 
@@ -17,10 +21,9 @@ class IngredientFilter(FilterSet):
 
 class RecipeFilter(FilterSet):
 
-    tags = filters.ModelMultipleChoiceFilter(
-        field_name='tags__slug',
-        to_field_name='slug',
-        queryset=Tag.objects.all(),
+    tags = filters.MultipleChoiceFilter(
+        choices=get_tag_choices,
+        method='filter_tags'
     )
     is_favorited = filters.BooleanFilter(
         field_name='is_favorited',
@@ -31,19 +34,40 @@ class RecipeFilter(FilterSet):
         method='filter_is_in_shopping_cart'
     )
     author = filters.ModelChoiceFilter(queryset=User.objects.all())
+    search = filters.CharFilter(method='filter_search')
+    ordering = filters.ChoiceFilter(
+        choices=((POPULAR_ORDERING, 'Сначала популярные'),),
+        method='filter_ordering'
+    )
 
     class Meta:
         model = Recipe
         fields = ('tags', 'author',)
 
-    def filter_is_favorited(self, recipes, name, value):
+    def filter_tags(self, recipes, name, value):
+        # Тег мог быть удалён после проверки slug: такие slug пропускаются,
+        # и если не осталось ни одного, выборка пуста.
+        tag_ids = tag_slugs.get_ids()
+        return recipes.filter(id__in=Recipe.tags.through.objects.filter(
+            tag_id__in=[tag_ids[slug] for slug in value if slug in tag_ids]
+        ).values('recipe_id'))
+
+    def filter_by_user_model(self, recipes, model, value):
         user = self.request.user
         if value and not user.is_anonymous:
-            return recipes.filter(favorites__author=user)
+            return recipes.filter(id__in=model.objects.filter(
+                author=user
+            ).values('recipe_id'))
         return recipes
 
+    def filter_is_favorited(self, recipes, name, value):
+        return self.filter_by_user_model(recipes, Favorite, value)
+
     def filter_is_in_shopping_cart(self, recipes, name, value):
-        user = self.request.user
-        if value and not user.is_anonymous:
-            return recipes.filter(shopping_carts__author=user)
-        return recipes
+        return self.filter_by_user_model(recipes, ShoppingCart, value)
+
+    def filter_search(self, recipes, name, value):
+        return search_recipes(recipes, value)
+
+    def filter_ordering(self, recipes, name, value):
+        return recipes.order_by('-favorites_count', '-created_at', '-id')
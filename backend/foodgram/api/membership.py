@@ -0,0 +1,114 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from core.cache import new_version
+from core.stats import CacheStats
+from recipes.models import Favorite, ShoppingCart
+from users.models import Subscription
+
+# Множества пользователя хранятся под его поколением: изменение
+# сдвигает поколение, и ранее закешированные множества не читаются.
+MEMBERSHIP_CACHE_KEY = 'membership:{}:{}'
+MEMBERSHIP_VERSION_KEY = 'membership_version:{}'
+
+FAVORITES = 'favorites'
+SHOPPING_CART = 'shopping_cart'
+SUBSCRIPTIONS = 'subscriptions'
+
+MEMBERSHIP_QUERIES = {
+    FAVORITES: lambda user_id: Favorite.objects.filter(
+        author_id=user_id
+    ).values_list('recipe_id', flat=True),
+    SHOPPING_CART: lambda user_id: ShoppingCart.objects.filter(
+        author_id=user_id
+    ).values_list('recipe_id', flat=True),
+    SUBSCRIPTIONS: lambda user_id: Subscription.objects.filter(
+        user_id=user_id
+    ).values_list('author_id', flat=True),
+}
+MODEL_FIELDS = {
+    Favorite: FAVORITES,
+    ShoppingCart: SHOPPING_CART,
+    Subscription: SUBSCRIPTIONS,
+}
+
+membership_stats = CacheStats('membership')
+
+
+class Membership:
+    """Множества id избранного, корзины и подписок пользователя.
+
+    Каждое множество загружается одним запросом при первом обращении
+    и живёт до конца запроса, а если задан MEMBERSHIP_CACHE_ALIAS —
+    ещё и в общем кеше под поколением пользователя. Изменения не читают
+    множества из базы: уже загруженные обновляются на месте, а поколение
+    в общем кеше сдвигается после коммита.
+    """
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.sets = {}
+        self.cache = None
+        self.invalidating = False
+        if settings.MEMBERSHIP_CACHE_ALIAS:
+            self.cache = caches[settings.MEMBERSHIP_CACHE_ALIAS]
+            self.version = self.cache.get_or_set(
+                self.version_key, new_version,
+                timeout=settings.MEMBERSHIP_CACHE_TIMEOUT
+            )
+            self.sets = self.cache.get(self.cache_key, {})
+
+    @property
+    def version_key(self):
+        return MEMBERSHIP_VERSION_KEY.format(self.user_id)
+
+    @property
+    def cache_key(self):
+        return MEMBERSHIP_CACHE_KEY.format(self.user_id, self.version)
+
+    def save(self):
+        if self.cache is not None:
+            self.cache.set(self.cache_key, self.sets,
+                           timeout=settings.MEMBERSHIP_CACHE_TIMEOUT)
+
+    def invalidate(self):
+        self.invalidating = False
+        self.cache.set(self.version_key, new_version(),
+                       timeout=settings.MEMBERSHIP_CACHE_TIMEOUT)
+
+    def get(self, field):
+        if field in self.sets:
+            membership_stats.hit()
+        else:
+            membership_stats.miss()
+            self.sets[field] = set(MEMBERSHIP_QUERIES[field](self.user_id))
+            self.save()
+        return self.sets[field]
+
+    def contains(self, field, object_id):
+        return object_id in self.get(field)
+
+    def changed(self):
+        if self.cache is not None and not self.invalidating:
+            self.invalidating = True
+            transaction.on_commit(self.invalidate)
+
+    def add(self, model, object_id):
+        if MODEL_FIELDS[model] in self.sets:
+            self.sets[MODEL_FIELDS[model]].add(object_id)
+        self.changed()
+
+    def discard(self, model, object_id):
+        if MODEL_FIELDS[model] in self.sets:
+            self.sets[MODEL_FIELDS[model]].discard(object_id)
+        self.changed()
+
+
+def get_membership(request):
+    """Состояние пользователя запроса, одно на весь запрос."""
+    membership = getattr(request, 'membership', None)
+    if membership is None:
+        membership = Membership(request.user.id)
+        request.membership = membership
+    return membership
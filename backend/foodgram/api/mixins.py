@@ -0,0 +1,230 @@
+import gzip
+import hashlib
+import json
+from functools import wraps
+from time import perf_counter
+from urllib.parse import urlencode
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import parse_etags
+from django.utils.decorators import classonlymethod
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from core.cache import get_version
+from core.stats import TimedCacheStats
+from core.sync import database_sync_to_async
+
+CATALOG_CACHE_KEY = 'catalog:{}:{}'
+RESPONSE_CACHE_KEY = 'response:{}:{}:{}'
+GZIP_ETAG_SUFFIX = '-gz'
+
+response_cache_stats = TimedCacheStats('responses')
+
+
+def get_catalog_response(request, catalog):
+    # У gzip-версии свой ETag: сильный ETag обещает побайтно одинаковое
+    # тело, и кеш не должен отдать сжатый ответ клиенту без gzip.
+    compressed = 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', '')
+    etag = catalog['etag']
+    if compressed:
+        etag = f'{etag[:-1]}{GZIP_ETAG_SUFFIX}"'
+    if etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+        response = HttpResponseNotModified()
+    elif compressed:
+        response = HttpResponse(catalog['gzip'],
+                                content_type='application/json')
+        response['Content-Encoding'] = 'gzip'
+    else:
+        response = HttpResponse(catalog['body'],
+                                content_type='application/json')
+    response['ETag'] = etag
+    response['Vary'] = 'Accept-Encoding'
+    return response
+
+
+def accepts_json(request):
+    """Клиент ждёт JSON, а не HTML-страницу browsable API."""
+    return (request.GET.get('format') is None
+            and 'text/html' not in request.META.get('HTTP_ACCEPT', ''))
+
+
+class AsyncViewSetMixin:
+    """Асинхронное представление вьюсета для работы под ASGI.
+
+    Включается настройкой ASYNC_VIEWS. Сначала вызывается
+    get_async_response — быстрый путь без DRF, например ответ из кеша.
+    Если он вернул None, обычное представление DRF выполняется в пуле
+    потоков, а не в общем синхронном потоке Django.
+    """
+
+    @classonlymethod
+    def as_view(cls, actions=None, **initkwargs):
+        view = super().as_view(actions, **initkwargs)
+        if not settings.ASYNC_VIEWS:
+            return view
+
+        # Потоковые ответы (список покупок) core.handlers.ASGIHandler
+        # дочитывает по частям в своём потоке.
+        sync_view = database_sync_to_async(view)
+
+        @wraps(view)
+        async def async_view(request, *args, **kwargs):
+            response = await cls.get_async_response(
+                request, view.actions.get(request.method.lower()), kwargs
+            )
+            if response is not None:
+                return response
+            return await sync_view(request, *args, **kwargs)
+
+        return async_view
+
+    @classmethod
+    async def get_async_response(cls, request, action, kwargs):
+        return None
+
+
+class CachedCatalogMixin:
+    """Отдаёт полный список справочника заранее собранными байтами.
+
+    JSON (и его gzip-версия) собирается из values() по полям сериализатора
+    один раз на поколение данных catalog_version и хранится в кеше.
+    Повторные запросы не создают сериализатор и получают ETag/304.
+    """
+
+    catalog_version = None
+
+    def build_catalog(self):
+        fields = self.get_serializer_class().Meta.fields
+        body = json.dumps(
+            list(self.get_queryset().values(*fields)),
+            ensure_ascii=False,
+            separators=(',', ':')
+        ).encode()
+        return {
+            'body': body,
+            'gzip': gzip.compress(body),
+            'etag': '"{}"'.format(hashlib.sha256(body).hexdigest()),
+        }
+
+    @classmethod
+    def get_catalog_key(cls):
+        return CATALOG_CACHE_KEY.format(
+            cls.catalog_version, get_version(cls.catalog_version)
+        )
+
+    @classmethod
+    def get_cached_catalog(cls):
+        return cache.get(cls.get_catalog_key())
+
+    def get_catalog(self):
+        catalog = self.get_cached_catalog()
+        if catalog is None:
+            catalog = self.build_catalog()
+            cache.set(self.get_catalog_key(), catalog, timeout=None)
+        return catalog
+
+    def list(self, request, *args, **kwargs):
+        if request.query_params:
+            return super().list(request, *args, **kwargs)
+        return get_catalog_response(request, self.get_catalog())
+
+    @classmethod
+    async def get_async_response(cls, request, action, kwargs):
+        if action != 'list' or request.GET:
+            return await super().get_async_response(request, action, kwargs)
+        catalog = await sync_to_async(
+            cls.get_cached_catalog, thread_sensitive=False
+        )()
+        if catalog is None:
+            return None
+        return get_catalog_response(request, catalog)
+
+
+class AnonymousResponseCacheMixin:
+    """Кеширует данные ответов list/retrieve для анонимных запросов.
+
+    Анонимный ответ не зависит от пользователя, поэтому ключом служат
+    действие, хост и нормализованная строка запроса. Записи устаревают
+    вместе с поколением response_cache_version.
+    """
+
+    response_cache_version = None
+    cached_actions = ('list', 'retrieve')
+
+    @classmethod
+    def build_response_cache_key(cls, request, action, kwargs):
+        params = request.GET
+        query = urlencode(sorted(
+            (key, value)
+            for key in params
+            for value in params.getlist(key) if value
+        ))
+        digest = hashlib.sha1('|'.join((
+            action, request.get_host(),
+            str(kwargs.get(cls.lookup_url_kwarg or cls.lookup_field)),
+            query
+        )).encode()).hexdigest()
+        return RESPONSE_CACHE_KEY.format(
+            cls.response_cache_version,
+            get_version(cls.response_cache_version),
+            digest
+        )
+
+    @classmethod
+    def get_cached_data(cls, request, action, kwargs):
+        return caches[settings.RESPONSE_CACHE_ALIAS].get(
+            cls.build_response_cache_key(request, action, kwargs)
+        )
+
+    def get_response_cache_key(self):
+        return self.build_response_cache_key(self.request, self.action,
+                                             self.kwargs)
+
+    def get_cached_response(self, handler, *args, **kwargs):
+        if (self.request.user.is_authenticated
+                or self.action not in self.cached_actions):
+            return handler(*args, **kwargs)
+        started = perf_counter()
+        response_cache = caches[settings.RESPONSE_CACHE_ALIAS]
+        key = self.get_response_cache_key()
+        data = response_cache.get(key)
+        if data is not None:
+            response_cache_stats.hit(perf_counter() - started)
+            return Response(data)
+        response = handler(*args, **kwargs)
+        if response.status_code == 200:
+            response_cache.set(key, response.data,
+                               timeout=settings.RESPONSE_CACHE_TIMEOUT)
+        response_cache_stats.miss(perf_counter() - started)
+        return response
+
+    @classmethod
+    async def get_async_response(cls, request, action, kwargs):
+        # Без заголовка Authorization токен-аутентификация даёт анонима.
+        if (action not in cls.cached_actions
+                or 'HTTP_AUTHORIZATION' in request.META
+                or not accepts_json(request)):
+            return await super().get_async_response(request, action, kwargs)
+        started = perf_counter()
+        data = await sync_to_async(
+            cls.get_cached_data, thread_sensitive=False
+        )(request, action, kwargs)
+        if data is None:
+            return None
+        response = HttpResponse(JSONRenderer().render(data),
+                                content_type='application/json')
+        response['Vary'] = 'Accept'
+        response_cache_stats.hit(perf_counter() - started)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(super().list, request,
+                                        *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(super().retrieve, request,
+                                        *args, **kwargs)
@@ -0,0 +1,31 @@
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination
+
+from .constants import CURSOR_PAGINATION_MODE, PAGINATION_MODE_QUERY_PARAM
+
+
+class RecipeCursorPagination(CursorPagination):
+    """Курсорная пагинация ленты рецептов по (created_at, id).
+
+    Не считает COUNT(*) и не использует OFFSET, поэтому глубина
+    прокрутки не влияет на время ответа. Включается ?pagination=cursor.
+
+    Курсор задаёт свой порядок, поэтому ?ordering и ранжирование ?search
+    с ним не сочетаются: такой запрос получает 400, а не молча другой
+    порядок.
+    """
+
+    ordering = ('-created_at', '-id')
+    page_size_query_param = 'limit'
+    incompatible_query_params = ('ordering', 'search')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        errors = {
+            param: (f'Не поддерживается с {PAGINATION_MODE_QUERY_PARAM}='
+                    f'{CURSOR_PAGINATION_MODE}.')
+            for param in self.incompatible_query_params
+            if request.query_params.get(param)
+        }
+        if errors:
+            raise ValidationError(errors)
+        return super().paginate_queryset(queryset, request, view)
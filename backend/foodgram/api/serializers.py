@@ -1,37 +1,42 @@
 from django.db import transaction
+from django.db.models import prefetch_related_objects
 from djoser.serializers import UserSerializer as DjoserUserSerializer
 from rest_framework import serializers
 
-from core.serializers import Base64ImageField
-from recipes.constants import MIN_RECIPE_INGREDIENT_AMOUNT
-from recipes.models import (
-    Favorite,
-    Ingredients,
-    Recipe,
-    RecipeIngredient,
-    ShoppingCart,
-    Tag
-)
-from users.models import Subscription, User
+from core.cache import bump_version_on_commit
+from core.counters import change_counter
+from core.profiling import ProfiledSerializerMixin
+from core.serializers import Base64ImageField, ImageVariantsField
+from recipes.constants import MIN_RECIPE_INGREDIENT_AMOUNT, RECIPES_VERSION
+from recipes.models import Ingredients, Recipe, RecipeIngredient, Tag
+from recipes.search import update_search_vectors
+from users.models import User
 
+from .constants import BULK_RECIPES_MAX_SIZE, RECIPES_LIMIT_DEFAULT
+from .membership import FAVORITES, SHOPPING_CART, SUBSCRIPTIONS, get_membership
 
-class UserSerializer(DjoserUserSerializer):
+
+class UserSerializer(ProfiledSerializerMixin, DjoserUserSerializer):
     is_subscribed = serializers.SerializerMethodField(
         method_name='get_is_subscribed'
     )
 
+    avatar_variants = ImageVariantsField()
+
     class Meta:
         model = User
-        fields = (*DjoserUserSerializer.Meta.fields, 'is_subscribed', 'avatar')
+        fields = (*DjoserUserSerializer.Meta.fields, 'is_subscribed', 'avatar',
+                  'avatar_variants')
 
     def get_is_subscribed(self, author):
         user = self.context.get('request').user
         if user.is_anonymous:
             return False
-        return Subscription.objects.filter(
-            user=user.id,
-            author=author.id
-        ).exists()
+        if hasattr(author, 'is_subscribed'):
+            return author.is_subscribed
+        return get_membership(self.context['request']).contains(
+            SUBSCRIPTIONS, author.id
+        )
 
 
 class AvatarSerializer(serializers.Serializer):
@@ -41,8 +46,9 @@ class AvatarSerializer(serializers.Serializer):
 
 
 class RecipeIngredientSerializer(serializers.ModelSerializer):
-    id = serializers.PrimaryKeyRelatedField(source='ingredient.id',
-                                            queryset=Ingredients.objects.all())
+    # Существование ингредиентов проверяет RecipesChangeSerializer
+    # одним запросом на весь список.
+    id = serializers.IntegerField(source='ingredient.id')
     name = serializers.ReadOnlyField(source='ingredient.name')
     measurement_unit = serializers.ReadOnlyField(
         source='ingredient.measurement_unit'
@@ -54,7 +60,8 @@ class RecipeIngredientSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'measurement_unit', 'amount')
 
 
-class IngredientsSerializer(serializers.ModelSerializer):
+class IngredientsSerializer(ProfiledSerializerMixin,
+                            serializers.ModelSerializer):
     """Сериалайзер для ингредиентов."""
 
     class Meta:
@@ -62,7 +69,7 @@ class IngredientsSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'measurement_unit',)
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(ProfiledSerializerMixin, serializers.ModelSerializer):
     """Сериалайзер для тегов."""
 
     class Meta:
@@ -70,12 +77,22 @@ class TagSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'slug')
 
 
-class BaseRecipesSerializer(serializers.ModelSerializer):
+class BaseRecipesSerializer(ProfiledSerializerMixin,
+                            serializers.ModelSerializer):
     image = Base64ImageField()
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'image_variants', 'cooking_time')
+
+
+class RecipeIdsSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=BULK_RECIPES_MAX_SIZE
+    )
 
 
 class RecipesReadSerializer(BaseRecipesSerializer):
@@ -100,24 +117,22 @@ class RecipesReadSerializer(BaseRecipesSerializer):
         )
         model = Recipe
 
-    def is_object_in_model(self, obj, model):
+    def is_in_membership(self, obj, field):
         request = self.context.get('request')
         if request.user.is_anonymous:
             return False
-        return model.objects.filter(author=request.user,
-                                    recipe=obj).exists()
+        return get_membership(request).contains(field, obj.id)
 
     def get_is_favorited(self, obj):
-        return self.is_object_in_model(obj, Favorite)
+        return self.is_in_membership(obj, FAVORITES)
 
     def get_is_in_shopping_cart(self, obj):
-        return self.is_object_in_model(obj, ShoppingCart)
+        return self.is_in_membership(obj, SHOPPING_CART)
 
 
 class RecipesChangeSerializer(BaseRecipesSerializer):
-    tags = serializers.PrimaryKeyRelatedField(
-        queryset=Tag.objects.all(), many=True, required=True
-    )
+    tags = serializers.ListField(child=serializers.IntegerField(),
+                                 required=True)
     author = UserSerializer(default=serializers.CurrentUserDefault())
     ingredients = RecipeIngredientSerializer(
         many=True,
@@ -130,6 +145,34 @@ class RecipesChangeSerializer(BaseRecipesSerializer):
         model = Recipe
         read_only_fields = ('author', )
 
+    def validate_tags(self, tag_ids):
+        tags = Tag.objects.in_bulk(tag_ids)
+        missing = sorted(set(tag_ids) - tags.keys())
+        if missing:
+            raise serializers.ValidationError(
+                'Тегов с id={} не существует.'.format(
+                    ', '.join(map(str, missing))
+                )
+            )
+        return [tags[tag_id] for tag_id in tag_ids]
+
+    def validate_ingredients(self, ingredients):
+        ingredient_ids = {
+            ingredient['ingredient']['id'] for ingredient in ingredients
+        }
+        missing = sorted(ingredient_ids - set(
+            Ingredients.objects.filter(id__in=ingredient_ids).values_list(
+                'id', flat=True
+            )
+        ))
+        if missing:
+            raise serializers.ValidationError(
+                'Ингредиентов с id={} не существует.'.format(
+                    ', '.join(map(str, missing))
+                )
+            )
+        return ingredients
+
     def validate(self, data):
         ingredients = data.get('recipe_ingredients')
         tags = data.get('tags')
@@ -159,13 +202,23 @@ class RecipesChangeSerializer(BaseRecipesSerializer):
 
     @transaction.atomic
     def create_ingredients_amounts(self, ingredients, recipe):
+        if not ingredients:
+            return
         RecipeIngredient.objects.bulk_create(
             (RecipeIngredient(
-                ingredient_id=ingredient['ingredient']['id'].id,
+                ingredient_id=ingredient['ingredient']['id'],
                 recipe=recipe,
                 amount=ingredient['amount']
             ) for ingredient in ingredients)
         )
+        # bulk_create не отправляет post_save, счётчики меняются здесь,
+        # а поисковый вектор — у вызывающего кода.
+        change_counter(
+            Ingredients.objects.filter(id__in=[
+                ingredient['ingredient']['id'] for ingredient in ingredients
+            ]),
+            'recipes_count', 1
+        )
 
     @transaction.atomic
     def create(self, validated_data):
@@ -174,27 +227,77 @@ class RecipesChangeSerializer(BaseRecipesSerializer):
         recipe = super().create(validated_data)
         recipe.tags.set(tags)
         self.create_ingredients_amounts(ingredients=ingredients, recipe=recipe)
+        update_search_vectors(Recipe.objects.filter(pk=recipe.pk))
         return recipe
 
+    def update_ingredients_amounts(self, ingredients, recipe):
+        """Применяет к рецепту только изменившиеся ингредиенты."""
+        amounts = {
+            ingredient['ingredient']['id']: ingredient['amount']
+            for ingredient in ingredients
+        }
+        existing = {
+            recipe_ingredient.ingredient_id: recipe_ingredient
+            for recipe_ingredient in RecipeIngredient.objects.filter(
+                recipe=recipe
+            ).only('id', 'ingredient_id', 'amount')
+        }
+        removed = {
+            ingredient_id: recipe_ingredient.id
+            for ingredient_id, recipe_ingredient in existing.items()
+            if ingredient_id not in amounts
+        }
+        changed = []
+        for ingredient_id, amount in amounts.items():
+            recipe_ingredient = existing.get(ingredient_id)
+            if recipe_ingredient and recipe_ingredient.amount != amount:
+                recipe_ingredient.amount = amount
+                changed.append(recipe_ingredient)
+        if removed:
+            # Удаление через QuerySet.delete() отправляло post_delete на
+            # каждую строку: пересчёт вектора и счётчика на строку.
+            RecipeIngredient.objects.delete_rows(removed.values())
+            change_counter(Ingredients.objects.filter(id__in=removed),
+                           'recipes_count', -1)
+        if changed:
+            RecipeIngredient.objects.bulk_update(changed, ('amount',))
+        added = [
+            ingredient for ingredient in ingredients
+            if ingredient['ingredient']['id'] not in existing
+        ]
+        self.create_ingredients_amounts(ingredients=added, recipe=recipe)
+        if removed or added:
+            update_search_vectors(Recipe.objects.filter(pk=recipe.pk))
+        if removed or changed or added:
+            # Массовые операции не отправляют сигналы моделей.
+            bump_version_on_commit(RECIPES_VERSION)
+
     @transaction.atomic
     def update(self, instance, validated_data):
-        tags = validated_data.pop('tags')
-        ingredients = validated_data.pop('recipe_ingredients')
-        instance.tags.clear()
-        instance.tags.set(tags)
-        instance.ingredients.clear()
-        self.create_ingredients_amounts(ingredients=ingredients,
-                                        recipe=instance)
-        return super().update(instance, validated_data)
+        tags = validated_data.pop('tags', None)
+        ingredients = validated_data.pop('recipe_ingredients', None)
+        if tags is not None:
+            # set() сам вычисляет разницу с текущими тегами.
+            instance.tags.set(tags)
+        if ingredients is not None:
+            self.update_ingredients_amounts(ingredients=ingredients,
+                                            recipe=instance)
+        changed_data = {
+            attr: value for attr, value in validated_data.items()
+            if getattr(instance, attr) != value
+        }
+        if not changed_data:
+            return instance
+        return super().update(instance, changed_data)
 
     def to_representation(self, instance):
+        # UpdateModelMixin сбрасывает кеш prefetch после сохранения.
+        prefetch_related_objects([instance], 'tags',
+                                 'recipe_ingredients__ingredient')
         return RecipesReadSerializer(instance, context=self.context).data
 
 
 class SubscriptionSerializer(UserSerializer):
-    recipes_count = serializers.SerializerMethodField(
-        method_name='get_recipes_count'
-    )
     recipes = serializers.SerializerMethodField(
         method_name='get_recipes'
     )
@@ -206,19 +309,15 @@ class SubscriptionSerializer(UserSerializer):
         )
         read_only_fields = fields
 
-    def get_recipes_count(self, user):
-        return user.recipes.count()
-
     def get_recipes(self, user):
-        request = self.context.get('request')
-        try:
-            recipes_limit = int(request.GET.get('recipes_limit', 10**10))
-        except ValueError:
-            raise serializers.ValidationError(
-                'recipes_limit принимает только целочисленные значения.'
-            )
+        if hasattr(user, 'latest_recipes'):
+            recipes = user.latest_recipes
+        else:
+            recipes = user.recipes.all()[:self.context.get(
+                'recipes_limit', RECIPES_LIMIT_DEFAULT
+            )]
         return BaseRecipesSerializer(
-            user.recipes.all()[:recipes_limit],
+            recipes,
             many=True,
             read_only=True
         ).data
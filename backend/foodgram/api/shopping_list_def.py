@@ -1,26 +1,203 @@
+import csv
+import json
 from datetime import datetime
 
+from rest_framework.renderers import BaseRenderer
 
-def form_shopping_list(user, ingredients, recipes):
-    format_time = datetime.now().strftime('%d-%m-%Y_%H_%M_%S')
-    shopping_list = [
-        f'Список покупок для {user.first_name} {user.last_name} '
-        f'от {format_time}\n'
-    ]
-    for numbering, ingredient in enumerate(ingredients, start=1):
-        shopping_list.append(
-            f'{numbering}. {ingredient["ingredient__name"].capitalize()}'
+PDF_LINES_PER_PAGE = 50
+PDF_PAGE_SIZE = (595, 842)
+PDF_FONT_SIZE = 11
+PDF_LEADING = 15
+PDF_MARGIN = 50
+
+# Кириллица cp1251 -> имена глифов Adobe для стандартного шрифта PDF.
+PDF_CYRILLIC_GLYPHS = (
+    '/afii10023', '/afii10071',
+    *(f'/afii{code}' for code in (
+        *range(10017, 10023), *range(10024, 10050),
+        *range(10065, 10071), *range(10072, 10098)
+    ))
+)
+
+
+class BaseShoppingListRenderer(BaseRenderer):
+    """Базовый рендерер списка покупок.
+
+    Подклассы реализуют stream() — генератор частей файла,
+    который отдаётся через StreamingHttpResponse.
+    """
+
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Вызывается DRF только для ответов с ошибками.
+        return json.dumps(data, ensure_ascii=False).encode()
+
+    def get_filename(self, user):
+        return 'shopping_list_{}_{}.{}'.format(
+            user.id, datetime.now().strftime('%d-%m-%Y_%H_%M_%S'),
+            self.format
         )
-        shopping_list.append(
-            ' - {amount} {ingredient__measurement_unit}\n'.format(**ingredient)
+
+    def get_title(self, user):
+        return (f'Список покупок для {user.first_name} {user.last_name} '
+                f'от {datetime.now().strftime("%d-%m-%Y_%H_%M_%S")}')
+
+    def lines(self, user, ingredients, recipes):
+        yield self.get_title(user)
+        for numbering, ingredient in enumerate(ingredients, start=1):
+            yield (
+                f'{numbering}. {ingredient["ingredient__name"].capitalize()}'
+                ' - {amount} {ingredient__measurement_unit}'.format(
+                    **ingredient
+                )
+            )
+        yield ('Все эти продукты вам пригодятся для приготовления '
+               'следующих рецептов:')
+        for recipe in recipes:
+            yield f'· {recipe}'
+        yield ''
+        yield 'С любовью, ваш Foodgram!'
+
+    def stream(self, user, ingredients, recipes):
+        raise NotImplementedError
+
+
+class TxtShoppingListRenderer(BaseShoppingListRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+    def stream(self, user, ingredients, recipes):
+        for line in self.lines(user, ingredients, recipes):
+            yield f'{line}\n'
+
+
+class CsvShoppingListRenderer(BaseShoppingListRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+    class Echo:
+        """Псевдо-буфер: csv.writer сразу возвращает записанную строку."""
+
+        def write(self, value):
+            return value
+
+    def stream(self, user, ingredients, recipes):
+        writer = csv.writer(self.Echo())
+        yield writer.writerow(('№', 'Ингредиент', 'Количество', 'Единица'))
+        for numbering, ingredient in enumerate(ingredients, start=1):
+            yield writer.writerow((
+                numbering,
+                ingredient['ingredient__name'],
+                ingredient['amount'],
+                ingredient['ingredient__measurement_unit']
+            ))
+
+
+class PdfShoppingListRenderer(BaseShoppingListRenderer):
+    """Минимальный PDF без сторонних библиотек.
+
+    Страницы пишутся в поток по мере накопления строк, смещения объектов
+    запоминаются для таблицы xref, которая выводится в конце.
+    """
+
+    media_type = 'application/pdf'
+    format = 'pdf'
+    charset = None
+
+    @staticmethod
+    def pdf_string(line):
+        text = line.encode('cp1251', errors='replace')
+        return b'(' + text.replace(b'\\', b'\\\\').replace(
+            b'(', b'\\(').replace(b')', b'\\)') + b')'
+
+    def page_content(self, lines):
+        content = [
+            b'BT /F1 %d Tf %d TL %d %d Td' % (
+                PDF_FONT_SIZE, PDF_LEADING,
+                PDF_MARGIN, PDF_PAGE_SIZE[1] - PDF_MARGIN
+            )
+        ]
+        content.extend(self.pdf_string(line) + b' Tj T*' for line in lines)
+        content.append(b'ET')
+        return b'\n'.join(content)
+
+    def stream(self, user, ingredients, recipes):
+        offsets = {}
+        position = 0
+        page_ids = []
+        next_id = 5
+
+        def write_object(object_id, body):
+            nonlocal position
+            offsets[object_id] = position
+            chunk = b'%d 0 obj\n%s\nendobj\n' % (object_id, body)
+            position += len(chunk)
+            return chunk
+
+        def write_page(lines):
+            nonlocal next_id
+            content = self.page_content(lines)
+            content_id, page_id = next_id, next_id + 1
+            next_id += 2
+            page_ids.append(page_id)
+            return write_object(
+                content_id,
+                b'<< /Length %d >>\nstream\n%s\nendstream' % (
+                    len(content), content
+                )
+            ) + write_object(
+                page_id,
+                b'<< /Type /Page /Parent 2 0 R /Contents %d 0 R '
+                b'/Resources << /Font << /F1 3 0 R >> >> >>' % content_id
+            )
+
+        header = b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n'
+        position = len(header)
+        yield header
+        yield write_object(1, b'<< /Type /Catalog /Pages 2 0 R >>')
+        yield write_object(
+            3,
+            b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica '
+            b'/Encoding 4 0 R >>'
         )
-    shopping_list.append(
-        'Все эти продукты вам пригодятся для приготовления '
-        'следующих рецептов:\n'
-    )
-    shopping_list.append('\n'.join(
-        f'· {recipe.name}'
-        for recipe in recipes
-    ))
-    shopping_list.append('\n\nС любовью, ваш Foodgram!')
-    return ''.join(shopping_list)
+        yield write_object(
+            4,
+            b'<< /Type /Encoding /BaseEncoding /WinAnsiEncoding '
+            b'/Differences [168 %s 184 %s 192 %s] >>' % (
+                PDF_CYRILLIC_GLYPHS[0].encode(),
+                PDF_CYRILLIC_GLYPHS[1].encode(),
+                ' '.join(PDF_CYRILLIC_GLYPHS[2:]).encode()
+            )
+        )
+        lines = []
+        for line in self.lines(user, ingredients, recipes):
+            lines.append(line)
+            if len(lines) == PDF_LINES_PER_PAGE:
+                yield write_page(lines)
+                lines = []
+        if lines or not page_ids:
+            yield write_page(lines)
+        yield write_object(
+            2,
+            b'<< /Type /Pages /Kids [%s] /Count %d /MediaBox [0 0 %d %d] >>'
+            % (
+                b' '.join(b'%d 0 R' % page_id for page_id in page_ids),
+                len(page_ids), *PDF_PAGE_SIZE
+            )
+        )
+        xref = [b'xref\n0 %d\n' % next_id, b'0000000000 65535 f \n']
+        xref.extend(
+            b'%010d 00000 n \n' % offsets[object_id]
+            for object_id in range(1, next_id)
+        )
+        yield b''.join(xref)
+        yield (b'trailer\n<< /Size %d /Root 1 0 R >>\n'
+               b'startxref\n%d\n%%%%EOF\n' % (next_id, position))
+
+
+SHOPPING_LIST_RENDERERS = (
+    TxtShoppingListRenderer,
+    CsvShoppingListRenderer,
+    PdfShoppingListRenderer,
+)
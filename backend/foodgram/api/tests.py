@@ -0,0 +1,483 @@
+from unittest import SkipTest, mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from recipes.models import (
+    Favorite,
+    Ingredients,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    Tag
+)
+from users.authentication import token_cache
+from users.models import Subscription, User
+
+from .filters import RecipeFilter
+
+RECIPES_COUNT = 6
+INGREDIENTS_PER_RECIPE = 3
+
+
+def create_user(name):
+    return User.objects.create_user(
+        email=f'{name}@example.com', username=name, first_name=name,
+        last_name=name, password='password-1234'
+    )
+
+
+class RecipesAPITestCase(APITestCase):
+    """Рецепты с тегами, ингредиентами и отметками пользователя."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('user')
+        cls.author = create_user('author')
+        cls.tags = [
+            Tag.objects.create(name=name, slug=slug)
+            for name, slug in (('Завтрак', 'breakfast'), ('Обед', 'lunch'),
+                               ('Ужин', 'dinner'))
+        ]
+        cls.ingredients = [
+            Ingredients.objects.create(name=f'ингредиент {number}',
+                                       measurement_unit='г')
+            for number in range(INGREDIENTS_PER_RECIPE + 1)
+        ]
+        cls.recipes = []
+        for number in range(RECIPES_COUNT):
+            recipe = Recipe.objects.create(
+                author=cls.author, name=f'Рецепт {number}',
+                text='Описание', cooking_time=10, image='recipes/test.png'
+            )
+            recipe.tags.set(cls.tags[number % 2:number % 2 + 2])
+            for ingredient in cls.ingredients[:INGREDIENTS_PER_RECIPE]:
+                RecipeIngredient.objects.create(
+                    recipe=recipe, ingredient=ingredient, amount=number + 1
+                )
+            cls.recipes.append(recipe)
+        Favorite.objects.create(author=cls.user, recipe=cls.recipes[0])
+        ShoppingCart.objects.create(author=cls.user, recipe=cls.recipes[1])
+
+    def setUp(self):
+        cache.clear()
+        token_cache.entries.clear()
+
+    def login(self):
+        self.client.force_authenticate(self.user)
+
+
+class RecipeListTests(RecipesAPITestCase):
+
+    def test_anonymous_list_queries(self):
+        # COUNT, страница, теги, строки ингредиентов и сами ингредиенты.
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse('recipe-list'))
+        self.assertEqual(response.data['count'], RECIPES_COUNT)
+
+    def test_list_queries(self):
+        self.login()
+        # Плюс по запросу на избранное, корзину и подписки пользователя.
+        with self.assertNumQueries(8):
+            response = self.client.get(reverse('recipe-list'))
+        flags = {
+            recipe['id']: (recipe['is_favorited'],
+                           recipe['is_in_shopping_cart'])
+            for recipe in response.data['results']
+        }
+        self.assertEqual(flags[self.recipes[0].id], (True, False))
+        self.assertEqual(flags[self.recipes[1].id], (False, True))
+        self.assertEqual(flags[self.recipes[2].id], (False, False))
+
+    def test_list_queries_do_not_depend_on_page_size(self):
+        self.login()
+        with self.assertNumQueries(8):
+            self.client.get(reverse('recipe-list'), {'limit': 1})
+
+    def test_detail_queries(self):
+        self.login()
+        recipe = self.recipes[0]
+        with self.assertNumQueries(7):
+            response = self.client.get(
+                reverse('recipe-detail', args=(recipe.id,))
+            )
+        self.assertEqual(len(response.data['ingredients']),
+                         INGREDIENTS_PER_RECIPE)
+        self.assertEqual(len(response.data['tags']), 2)
+        self.assertTrue(response.data['is_favorited'])
+
+
+class SubscriptionTests(RecipesAPITestCase):
+
+    def test_invalid_recipes_limit_does_not_subscribe(self):
+        self.login()
+        response = self.client.post('{}?recipes_limit=abc'.format(
+            reverse('user-subscribe', args=(self.author.id,))
+        ))
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Subscription.objects.filter(
+            user=self.user, author=self.author
+        ).exists())
+
+    def test_no_subscriptions(self):
+        self.login()
+        response = self.client.get(reverse('user-subscriptions'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 0)
+        self.assertEqual(response.data['results'], [])
+
+    def test_subscriptions_queries(self):
+        for number in range(3):
+            Subscription.objects.create(user=self.user,
+                                        author=create_user(f'extra{number}'))
+        Subscription.objects.create(user=self.user, author=self.author)
+        self.login()
+        # COUNT, страница авторов, последние рецепты авторов страницы.
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('user-subscriptions'),
+                                       {'recipes_limit': 2, 'limit': 2})
+        self.assertEqual(response.data['count'], 4)
+        recipes = {
+            author['id']: [recipe['id'] for recipe in author['recipes']]
+            for author in response.data['results']
+        }
+        self.assertEqual(recipes.get(self.author.id),
+                         [recipe.id for recipe in self.recipes[:-3:-1]])
+
+
+class RecipeFilterTests(RecipesAPITestCase):
+
+    def get_ids(self, params):
+        response = self.client.get(reverse('recipe-list'),
+                                   {'limit': RECIPES_COUNT, **params})
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def test_tags_are_combined_without_duplicates(self):
+        ids = self.get_ids({'tags': ['breakfast', 'dinner']})
+        self.assertCountEqual(ids, [recipe.id for recipe in self.recipes])
+
+    def test_single_tag(self):
+        self.assertCountEqual(
+            self.get_ids({'tags': 'breakfast'}),
+            [recipe.id for recipe in self.recipes[::2]]
+        )
+
+    def test_unknown_tag(self):
+        response = self.client.get(reverse('recipe-list'),
+                                   {'tags': 'unknown'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_tag_removed_after_validation(self):
+        tag_ids = {tag.slug: tag.id for tag in self.tags[:2]}
+        with mock.patch('api.filters.tag_slugs') as tag_slugs:
+            tag_slugs.get_ids.return_value = tag_ids
+            self.assertCountEqual(
+                self.get_ids({'tags': ['breakfast', 'dinner']}),
+                [recipe.id for recipe in self.recipes[::2]]
+            )
+            self.assertEqual(self.get_ids({'tags': 'dinner'}), [])
+
+    def test_tags_use_through_table_index(self):
+        recipes = RecipeFilter(
+            {'tags': ['breakfast', 'dinner']}, queryset=Recipe.objects.all()
+        ).qs
+        # Подзапрос IN по промежуточной таблице вместо JOIN с DISTINCT.
+        sql = str(recipes.query)
+        self.assertIn('IN (SELECT U0."recipe_id" FROM "recipes_recipe_tags"',
+                      sql)
+        self.assertNotIn('DISTINCT', sql)
+        with connection.cursor() as cursor:
+            # На нескольких строках планировщик и так читает таблицы
+            # целиком; SET LOCAL действует до отката транзакции теста.
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        self.assertIn('recipes_recipe_tags_tag_id', recipes.explain())
+
+    def test_user_flags(self):
+        self.login()
+        self.assertEqual(self.get_ids({'is_favorited': 1}),
+                         [self.recipes[0].id])
+        self.assertEqual(self.get_ids({'is_in_shopping_cart': 1}),
+                         [self.recipes[1].id])
+
+    def test_user_flags_are_ignored_for_anonymous(self):
+        self.assertEqual(len(self.get_ids({'is_favorited': 1})),
+                         RECIPES_COUNT)
+
+    def test_cursor_keeps_feed_order(self):
+        self.assertEqual(
+            self.get_ids({'pagination': 'cursor'}),
+            [recipe.id for recipe in reversed(self.recipes)]
+        )
+
+    def test_cursor_rejects_other_orderings(self):
+        for params in ({'ordering': 'popular'}, {'search': 'Рецепт'}):
+            with self.subTest(params=params):
+                response = self.client.get(reverse('recipe-list'),
+                                           {'pagination': 'cursor', **params})
+                self.assertEqual(response.status_code, 400)
+                self.assertIn(next(iter(params)), response.data)
+
+    def test_author(self):
+        self.assertEqual(len(self.get_ids({'author': self.author.id})),
+                         RECIPES_COUNT)
+        self.assertEqual(self.get_ids({'author': self.user.id}), [])
+
+
+class RecipeSearchTests(RecipesAPITestCase):
+    """Поиск ?search=: полнотекстовый и по триграммам слов названия."""
+
+    @classmethod
+    def setUpClass(cls):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT to_regprocedure('word_similarity(text, text)')"
+            )
+            if cursor.fetchone()[0] is None:
+                raise SkipTest('Нет расширения pg_trgm.')
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.goulash, cls.soup, cls.stew = (
+            Recipe.objects.create(
+                author=cls.author, name=name, text=text, cooking_time=10,
+                image='recipes/test.png'
+            )
+            for name, text in (
+                ('Гуляш по-венгерски', 'Говядина с паприкой'),
+                ('Суп с фрикадельками', 'Куриный бульон'),
+                ('Овощное рагу', 'Подавать вместо супа'),
+            )
+        )
+
+    def search(self, text):
+        response = self.client.get(reverse('recipe-list'), {'search': text})
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def test_exact_match(self):
+        self.assertEqual(self.search('гуляш'), [self.goulash.id])
+
+    def test_typo_in_one_word_of_name(self):
+        self.assertEqual(self.search('гулящ'), [self.goulash.id])
+
+    def test_name_ranked_above_description(self):
+        self.assertEqual(self.search('суп'), [self.soup.id, self.stew.id])
+
+
+class CatalogResponseTests(RecipesAPITestCase):
+
+    def get_tags(self, **headers):
+        return self.client.get(reverse('tag-list'), **headers)
+
+    def test_gzip_and_identity_have_different_etags(self):
+        identity = self.get_tags()
+        compressed = self.get_tags(HTTP_ACCEPT_ENCODING='gzip')
+        self.assertNotIn('Content-Encoding', identity)
+        self.assertEqual(compressed['Content-Encoding'], 'gzip')
+        self.assertNotEqual(identity['ETag'], compressed['ETag'])
+        for response in (identity, compressed):
+            self.assertIn('Accept-Encoding', response['Vary'])
+
+    def test_not_modified_only_for_own_encoding(self):
+        identity_etag = self.get_tags()['ETag']
+        response = self.get_tags(HTTP_ACCEPT_ENCODING='gzip',
+                                 HTTP_IF_NONE_MATCH=identity_etag)
+        self.assertEqual(response.status_code, 200)
+        response = self.get_tags(HTTP_ACCEPT_ENCODING='gzip',
+                                 HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.get_tags(
+            HTTP_IF_NONE_MATCH=identity_etag
+        ).status_code, 304)
+
+
+class MembershipTests(RecipesAPITestCase):
+
+    def get_favorited(self, recipe):
+        return self.client.get(
+            reverse('recipe-detail', args=(recipe.id,))
+        ).data['is_favorited']
+
+    def test_toggle_does_not_load_sets(self):
+        self.login()
+        url = reverse('recipe-favorite', args=(self.recipes[2].id,))
+        # Вставка с чтением рецепта одним запросом и сдвиг счётчика;
+        # транзакция внутри теста — это SAVEPOINT и RELEASE SAVEPOINT.
+        with self.assertNumQueries(4):
+            response = self.client.post(url)
+        self.assertEqual(response.status_code, 201)
+        with self.assertNumQueries(4):
+            response = self.client.delete(url)
+        self.assertEqual(response.status_code, 204)
+
+    @override_settings(MEMBERSHIP_CACHE_ALIAS='default')
+    def test_cached_sets_follow_changes(self):
+        self.login()
+        recipe = self.recipes[2]
+        self.assertFalse(self.get_favorited(recipe))
+        # Множества уже в кеше: запросы только за самим рецептом.
+        with self.assertNumQueries(4):
+            self.assertFalse(self.get_favorited(recipe))
+        url = reverse('recipe-favorite', args=(recipe.id,))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(url)
+        self.assertTrue(self.get_favorited(recipe))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(url)
+        self.assertFalse(self.get_favorited(recipe))
+
+
+class FavoriteCartTests(RecipesAPITestCase):
+    """Добавление в избранное и список покупок: по одному и списком."""
+
+    def setUp(self):
+        super().setUp()
+        self.login()
+
+    def favorite_ids(self):
+        return set(Favorite.objects.filter(author=self.user).values_list(
+            'recipe_id', flat=True
+        ))
+
+    def favorites_count(self, recipe):
+        return Recipe.objects.get(id=recipe.id).favorites_count
+
+    def test_single_recipe_statuses(self):
+        recipe = self.recipes[2]
+        url = reverse('recipe-favorite', args=(recipe.id,))
+        missing_url = reverse(
+            'recipe-favorite',
+            args=(max(recipe.id for recipe in self.recipes) + 1,)
+        )
+        # Вставка с проверкой рецепта одним запросом, сдвиг счётчика
+        # и точка сохранения вокруг них.
+        with self.assertNumQueries(4):
+            response = self.client.post(url)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['id'], recipe.id)
+        self.assertEqual(self.client.post(url).status_code, 400)
+        self.assertEqual(self.client.post(missing_url).status_code, 404)
+        with self.assertNumQueries(4):
+            response = self.client.delete(url)
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.client.delete(url).status_code, 400)
+        self.assertEqual(self.client.delete(missing_url).status_code, 404)
+        self.assertNotIn(recipe.id, self.favorite_ids())
+
+    def test_add_skips_present_recipes(self):
+        ids = [recipe.id for recipe in self.recipes[:3]]
+        response = self.client.post(reverse('recipe-favorite-bulk'),
+                                    {'ids': ids}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertCountEqual([recipe['id'] for recipe in response.data],
+                              ids[1:])
+        self.assertEqual(self.favorite_ids(), set(ids))
+        self.assertEqual(self.favorites_count(self.recipes[0]), 1)
+        self.assertEqual(self.favorites_count(self.recipes[1]), 1)
+
+    def test_remove_skips_absent_recipes(self):
+        ids = [recipe.id for recipe in self.recipes[:3]]
+        response = self.client.delete(reverse('recipe-favorite-bulk'),
+                                      {'ids': ids}, format='json')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.favorite_ids(), set())
+        self.assertEqual(self.favorites_count(self.recipes[0]), 0)
+        self.assertEqual(self.favorites_count(self.recipes[1]), 0)
+
+    def test_missing_recipe_rolls_back(self):
+        missing_id = max(recipe.id for recipe in self.recipes) + 1
+        response = self.client.post(
+            reverse('recipe-shopping-cart-bulk'),
+            {'ids': [self.recipes[2].id, missing_id]}, format='json'
+        )
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(ShoppingCart.objects.filter(
+            author=self.user, recipe=self.recipes[2]
+        ).exists())
+        self.assertEqual(Recipe.objects.get(id=self.recipes[2].id).cart_count,
+                         0)
+
+    def test_queries_do_not_depend_on_size(self):
+        url = reverse('recipe-favorite-bulk')
+        # Изменение одним запросом, сдвиг счётчиков и точки сохранения
+        # вложенных транзакций.
+        with self.assertNumQueries(6):
+            self.client.post(url, {'ids': [self.recipes[2].id]},
+                             format='json')
+        with self.assertNumQueries(6):
+            self.client.post(
+                url, {'ids': [recipe.id for recipe in self.recipes[3:]]},
+                format='json'
+            )
+
+
+class RecipeUpdateTests(RecipesAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.author)
+
+    def update(self, recipe, ingredients, tags=None, amount=7):
+        return self.client.patch(
+            reverse('recipe-detail', args=(recipe.id,)),
+            {'tags': [tag.id for tag in tags or self.tags[2:]],
+             'ingredients': [{'id': ingredient.id, 'amount': amount}
+                             for ingredient in ingredients]},
+            format='json'
+        )
+
+    def test_queries_do_not_depend_on_ingredients(self):
+        # Проверка тегов и ингредиентов, удаление, вставка, счётчики
+        # и поисковый вектор — по запросу на операцию, а не на строку.
+        for recipe, kept in ((self.recipes[2], 2), (self.recipes[4], 1)):
+            with self.subTest(kept=kept), self.assertNumQueries(29):
+                response = self.update(
+                    recipe, self.ingredients[:kept] + self.ingredients[3:]
+                )
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.data['ingredients']), kept + 1)
+        self.assertEqual(
+            Ingredients.objects.get(id=self.ingredients[1].id).recipes_count,
+            RECIPES_COUNT - 1
+        )
+        self.assertEqual(
+            Ingredients.objects.get(id=self.ingredients[3].id).recipes_count,
+            2
+        )
+
+    def test_unchanged_data_is_not_written(self):
+        number = 2
+        with CaptureQueriesContext(connection) as context:
+            response = self.update(
+                self.recipes[number],
+                self.ingredients[:INGREDIENTS_PER_RECIPE],
+                tags=self.tags[number % 2:number % 2 + 2],
+                amount=number + 1
+            )
+        self.assertEqual(response.status_code, 200)
+        writes = [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].lstrip().upper().startswith(
+                ('INSERT', 'UPDATE', 'DELETE')
+            )
+        ]
+        self.assertEqual(writes, [])
+
+    def test_unknown_ids(self):
+        missing = Ingredients(id=max(
+            ingredient.id for ingredient in self.ingredients
+        ) + 1)
+        response = self.update(self.recipes[2], [missing])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('ingredients', response.data)
+        response = self.update(self.recipes[2], self.ingredients[:1],
+                               tags=[Tag(id=self.tags[-1].id + 1)])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('tags', response.data)
@@ -1,14 +1,17 @@
-from datetime import datetime
-
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db.models import Sum
-from django.http import FileResponse
+from django.db import transaction
+from django.db.models import F, Prefetch, Sum, Value, prefetch_related_objects
+from django.db.models.expressions import RawSQL, Window
+from django.db.models.functions import RowNumber
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.urls import reverse
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet as DjoserUserViewSet
 from rest_framework import response, status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.permissions import (
     SAFE_METHODS,
@@ -18,7 +21,14 @@ from rest_framework.permissions import (
 )
 from rest_framework.response import Response
 from rest_framework.serializers import ValidationError
+from rest_framework.settings import api_settings
 
+from recipes.constants import (
+    INGREDIENTS_VERSION,
+    RECIPES_VERSION,
+    TAGS_VERSION
+)
+from recipes.ingredient_index import ingredient_index
 from recipes.models import (
     Favorite,
     Ingredients,
@@ -27,46 +37,92 @@ from recipes.models import (
     ShoppingCart,
     Tag
 )
+from recipes.short_links import encode_id, recipe_ids
+from recipes.units import normalize_ingredients
 from users.models import Subscription
 
+from .constants import (
+    CURSOR_PAGINATION_MODE,
+    PAGINATION_MODE_QUERY_PARAM,
+    RECIPES_LIMIT_DEFAULT
+)
 from .filters import IngredientFilter, RecipeFilter
+from .membership import get_membership
+from .mixins import (
+    AnonymousResponseCacheMixin,
+    AsyncViewSetMixin,
+    CachedCatalogMixin
+)
+from .pagination import RecipeCursorPagination
 from .permissions import IsAuthorOrReadOnly
 from .serializers import (
     AvatarSerializer,
     BaseRecipesSerializer,
     IngredientsSerializer,
+    RecipeIdsSerializer,
     RecipesChangeSerializer,
     RecipesReadSerializer,
     SubscriptionSerializer,
     TagSerializer,
     UserSerializer
 )
-from .shopping_list_def import form_shopping_list
+from .shopping_list_def import (
+    SHOPPING_LIST_RENDERERS,
+    BaseShoppingListRenderer,
+    TxtShoppingListRenderer
+)
 
 User = get_user_model()
 
 
-class IngredientsViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientsViewSet(CachedCatalogMixin, AsyncViewSetMixin,
+                         viewsets.ReadOnlyModelViewSet):
     queryset = Ingredients.objects.all()
     serializer_class = IngredientsSerializer
     permission_classes = (AllowAny,)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = IngredientFilter
     pagination_class = None
+    catalog_version = INGREDIENTS_VERSION
+
+    def list(self, request, *args, **kwargs):
+        name = request.query_params.get('name')
+        if name is None:
+            return super().list(request, *args, **kwargs)
+        return Response(ingredient_index.search(
+            name, settings.INGREDIENT_SEARCH_LIMIT
+        ))
 
 
-class TagsViewSet(viewsets.ReadOnlyModelViewSet):
+class TagsViewSet(CachedCatalogMixin, AsyncViewSetMixin,
+                  viewsets.ReadOnlyModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = (AllowAny,)
     pagination_class = None
+    catalog_version = TAGS_VERSION
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(AnonymousResponseCacheMixin, AsyncViewSetMixin,
+                    viewsets.ModelViewSet):
     queryset = Recipe.objects.all()
     permission_classes = (IsAuthenticatedOrReadOnly, IsAuthorOrReadOnly)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
+    response_cache_version = RECIPES_VERSION
+
+    @property
+    def paginator(self):
+        if (not hasattr(self, '_paginator')
+                and self.request.query_params.get(
+                    PAGINATION_MODE_QUERY_PARAM) == CURSOR_PAGINATION_MODE):
+            self._paginator = RecipeCursorPagination()
+        return super().paginator
+
+    def get_queryset(self):
+        return Recipe.objects.select_related('author').prefetch_related(
+            'tags', 'recipe_ingredients__ingredient'
+        ).defer('search_vector')
 
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
@@ -76,18 +132,66 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return RecipesReadSerializer
         return RecipesChangeSerializer
 
+    @staticmethod
+    def get_recipe_id(pk):
+        try:
+            return int(pk)
+        except ValueError:
+            raise NotFound(f'Рецепта с id={pk} не существует.')
+
     def add_recipe_to_model(self, model, user, pk):
-        if model.objects.filter(author=user, recipe__id=pk).exists():
-            raise ValidationError(f'Рецепта с id={pk} не существует.')
-        recipe = get_object_or_404(Recipe, id=pk)
-        model.objects.create(author=user, recipe=recipe)
+        recipes = model.objects.add_recipes(user, (self.get_recipe_id(pk),))
+        if not recipes:
+            raise NotFound(f'Рецепта с id={pk} не существует.')
+        recipe, = recipes
+        if not recipe.changed:
+            raise ValidationError(f'Рецепт с id={pk} уже добавлен.')
+        get_membership(self.request).add(model, recipe.id)
         return Response(BaseRecipesSerializer(recipe).data,
                         status=status.HTTP_201_CREATED)
 
     def delete_recipe_from_model(self, model, user, pk):
-        if not Recipe.objects.filter(id=pk).exists():
-            raise ValidationError(f'Рецепта с id={pk} не существует.')
-        get_object_or_404(model, author=user, recipe__id=pk).delete()
+        recipes = model.objects.remove_recipes(user, (self.get_recipe_id(pk),))
+        if not recipes:
+            raise NotFound(f'Рецепта с id={pk} не существует.')
+        recipe, = recipes
+        if not recipe.changed:
+            raise ValidationError(f'Рецепта с id={pk} нет в списке.')
+        get_membership(self.request).discard(model, recipe.id)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    def change_recipes_in_bulk(self, model, request):
+        """Добавляет или удаляет сразу несколько рецептов.
+
+        Уже добавленные (или отсутствующие в списке) рецепты пропускаются,
+        а несуществующий id отменяет всю операцию.
+        """
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        recipe_ids = set(serializer.validated_data['ids'])
+        with transaction.atomic():
+            if request.method == 'POST':
+                recipes = model.objects.add_recipes(request.user, recipe_ids)
+            else:
+                recipes = model.objects.remove_recipes(request.user,
+                                                       recipe_ids)
+            missing = recipe_ids - {recipe.id for recipe in recipes}
+            if missing:
+                raise NotFound('Рецептов с id={} не существует.'.format(
+                    ', '.join(map(str, sorted(missing)))
+                ))
+        changed = [recipe for recipe in recipes if recipe.changed]
+        membership = get_membership(request)
+        for recipe in changed:
+            if request.method == 'POST':
+                membership.add(model, recipe.id)
+            else:
+                membership.discard(model, recipe.id)
+        if request.method == 'POST':
+            return Response(
+                BaseRecipesSerializer(changed, many=True).data,
+                status=status.HTTP_201_CREATED
+            )
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(
@@ -102,6 +206,17 @@ class RecipeViewSet(viewsets.ModelViewSet):
         return self.delete_recipe_from_model(model=ShoppingCart,
                                              user=request.user, pk=pk)
 
+    @action(
+        detail=False,
+        methods=['post', 'delete'],
+        url_path='shopping_cart',
+        url_name='shopping-cart-bulk',
+        permission_classes=[IsAuthenticated]
+    )
+    def shopping_cart_bulk(self, request):
+        return self.change_recipes_in_bulk(model=ShoppingCart,
+                                           request=request)
+
     @action(
         detail=True,
         methods=['POST', 'DELETE'],
@@ -118,38 +233,57 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
     @action(
         detail=False,
+        methods=['POST', 'DELETE'],
+        url_path='favorite',
+        url_name='favorite-bulk',
         permission_classes=[IsAuthenticated]
     )
+    def favorite_bulk(self, request):
+        return self.change_recipes_in_bulk(model=Favorite, request=request)
+
+    @action(
+        detail=False,
+        permission_classes=[IsAuthenticated],
+        renderer_classes=(*api_settings.DEFAULT_RENDERER_CLASSES,
+                          *SHOPPING_LIST_RENDERERS)
+    )
     def download_shopping_cart(self, request):
         user = request.user
+        renderer = request.accepted_renderer
+        if not isinstance(renderer, BaseShoppingListRenderer):
+            renderer = TxtShoppingListRenderer()
         ingredients = RecipeIngredient.objects.filter(
             recipe__shopping_carts__author=user
         ).values(
             'ingredient__name',
             'ingredient__measurement_unit'
         ).annotate(amount=Sum('amount')).order_by('ingredient__name')
-        recipes = [
-            shopping_cart.recipe
-            for shopping_cart in ShoppingCart.objects.filter(author=user)
-        ]
-        shopping_list = form_shopping_list(user=user,
-                                           ingredients=ingredients,
-                                           recipes=recipes)
-        filename = ('shopping_list_{}_{}.txt'.format(
-            user.id, datetime.now().strftime("%d-%m-%Y_%H_%M_%S")
-        ))
-        return FileResponse(shopping_list,
-                            content_type='text/plain',
-                            as_attachment=True,
-                            filename=filename)
+        recipes = Recipe.objects.filter(
+            shopping_carts__author=user
+        ).values_list('name', flat=True)
+        response = StreamingHttpResponse(
+            renderer.stream(user=user,
+                            ingredients=normalize_ingredients(
+                                ingredients.iterator()
+                            ),
+                            recipes=recipes.iterator()),
+            content_type=(f'{renderer.media_type}; charset={renderer.charset}'
+                          if renderer.charset else renderer.media_type)
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="{renderer.get_filename(user)}"'
+        )
+        return response
 
     @action(detail=True, methods=['GET'], url_path='get-link')
     def get_short_link(self, request, pk: int):
-        if not Recipe.objects.filter(id=pk).exists():
-            raise ValidationError(f'Рецепта с id={pk} не существует.')
+        recipe_id = self.get_recipe_id(pk)
+        if not recipe_ids.contains(recipe_id):
+            raise NotFound(f'Рецепта с id={pk} не существует.')
         return Response(
             {'short-link': request.build_absolute_uri(
-                reverse('recipe:recipe-redirect', args=(pk,))
+                reverse('recipe:recipe-short-link',
+                        args=(encode_id(recipe_id),))
             )},
             status=status.HTTP_200_OK
         )
@@ -161,6 +295,39 @@ class UserViewSet(DjoserUserViewSet):
     pagination_class = PageNumberPagination
     pagination_class.page_size_query_param = 'limit'
 
+    def get_recipes_limit(self):
+        try:
+            recipes_limit = int(self.request.query_params.get(
+                'recipes_limit', RECIPES_LIMIT_DEFAULT
+            ))
+        except ValueError:
+            raise ValidationError(
+                'recipes_limit принимает только целочисленные значения.'
+            )
+        if recipes_limit < 0:
+            raise ValidationError(
+                'recipes_limit не может быть отрицательным.'
+            )
+        return recipes_limit
+
+    def get_latest_recipes(self, author_ids, recipes_limit):
+        """Последние recipes_limit рецептов каждого автора одним запросом."""
+        if not author_ids:
+            # Для пустого id__in Django не строит SQL (EmptyResultSet).
+            return Recipe.objects.none()
+        ranked = Recipe.objects.filter(author_id__in=author_ids).annotate(
+            row_number=Window(
+                expression=RowNumber(),
+                partition_by=F('author'),
+                order_by=F('created_at').desc(),
+            )
+        ).order_by().values('id', 'row_number')
+        sql, params = ranked.query.sql_with_params()
+        return Recipe.objects.filter(id__in=RawSQL(
+            f'SELECT id FROM ({sql}) AS ranked WHERE row_number <= %s',
+            (*params, recipes_limit)
+        ))
+
     @action(
         detail=True,
         methods=['post', 'delete'],
@@ -174,13 +341,17 @@ class UserViewSet(DjoserUserViewSet):
 
         if request.method == 'DELETE':
             get_object_or_404(Subscription, user=user, author=author).delete()
+            get_membership(request).discard(Subscription, author.id)
             return Response(status=status.HTTP_204_NO_CONTENT)
 
+        # Некорректный recipes_limit не должен оставлять подписку.
+        recipes_limit = self.get_recipes_limit()
         Subscription.objects.get_or_create(user=user, author=author)
+        get_membership(request).add(Subscription, author.id)
         serializer = SubscriptionSerializer(
             author,
             data=request.data,
-            context={'request': request}
+            context={'request': request, 'recipes_limit': recipes_limit}
         )
         serializer.is_valid()
         return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -191,8 +362,20 @@ class UserViewSet(DjoserUserViewSet):
     )
     def subscriptions(self, request):
         user = request.user
-        queryset = User.objects.filter(authors__user=user)
-        pages = self.paginate_queryset(queryset)
+        recipes_limit = self.get_recipes_limit()
+        pages = self.paginate_queryset(User.objects.filter(
+            authors__user=user
+        ).annotate(
+            is_subscribed=Value(True),
+        ).order_by('date_joined'))
+        # Окно ранжирует рецепты только авторов текущей страницы.
+        prefetch_related_objects(pages, Prefetch(
+            'recipes',
+            queryset=self.get_latest_recipes(
+                [author.id for author in pages], recipes_limit
+            ),
+            to_attr='latest_recipes'
+        ))
         serializer = SubscriptionSerializer(pages,
                                             many=True,
                                             context={'request': request})
@@ -215,7 +398,7 @@ class UserViewSet(DjoserUserViewSet):
 
             avatar_data = serializer.validated_data.get('avatar')
             request.user.avatar = avatar_data
-            request.user.save()
+            request.user.save(update_fields=('avatar',))
 
             image_url = request.build_absolute_uri(
                 f'/media/users/{avatar_data.name}'
@@ -223,9 +406,9 @@ class UserViewSet(DjoserUserViewSet):
             return response.Response(
                 {'avatar': str(image_url)}, status=status.HTTP_200_OK
             )
-        self.request.user.avatar.delete()
+        self.request.user.avatar.delete(save=False)
         self.request.user.avatar = None
-        self.request.user.save()
+        self.request.user.save(update_fields=('avatar',))
         return response.Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(
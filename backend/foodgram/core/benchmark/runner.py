@@ -0,0 +1,204 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from time import perf_counter
+from urllib.error import HTTPError
+from urllib.parse import quote
+from urllib.request import HTTPRedirectHandler, Request, build_opener
+
+from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+PERCENTILES = (50, 95, 99)
+GUNICORN_START_TIMEOUT = 30
+SERVER_MODES = ('wsgi', 'asgi')
+HTTP_TIMEOUT = 10
+# Хост из ALLOWED_HOSTS по умолчанию вместо testserver.
+CLIENT_HOST = 'localhost'
+
+
+def percentile(values, percent):
+    """Значение по методу ближайшего ранга."""
+    ordered = sorted(values)
+    rank = max(1, -(-percent * len(ordered) // 100))
+    return ordered[rank - 1]
+
+
+def summarize(latencies, statuses, expected_status, elapsed):
+    summary = {
+        'requests': len(latencies),
+        'errors': sum(status != expected_status for status in statuses),
+        'rps': len(latencies) / elapsed if elapsed else 0.0,
+        'mean_ms': 1000 * sum(latencies) / len(latencies),
+    }
+    for percent in PERCENTILES:
+        summary[f'p{percent}_ms'] = 1000 * percentile(latencies, percent)
+    return summary
+
+
+def get_clients(context):
+    anonymous = APIClient(SERVER_NAME=CLIENT_HOST)
+    authenticated = APIClient(SERVER_NAME=CLIENT_HOST)
+    authenticated.credentials(HTTP_AUTHORIZATION=f'Token {context["token"]}')
+    return anonymous, authenticated
+
+
+def run_client(scenarios, context, iterations):
+    """Прогоняет сценарии через тестовый клиент Django в этом процессе.
+
+    Сценарии чередуются внутри итерации, поэтому пары «добавить/удалить»
+    не ломают друг другу состояние. Число запросов к базе — максимум
+    по итерациям.
+    """
+    anonymous, authenticated = get_clients(context)
+    results = {
+        scenario.name: {'latencies': [], 'statuses': [], 'queries': 0}
+        for scenario in scenarios
+    }
+    for _ in range(iterations):
+        for scenario in scenarios:
+            client = authenticated if scenario.auth else anonymous
+            result = results[scenario.name]
+            with CaptureQueriesContext(connection) as queries:
+                request_started = perf_counter()
+                response = getattr(client, scenario.method)(
+                    scenario.get_path(context),
+                    scenario.get_data(context),
+                    format='json'
+                )
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                result['latencies'].append(perf_counter() - request_started)
+            result['statuses'].append(response.status_code)
+            result['queries'] = max(result['queries'], len(queries))
+    return {
+        scenario.name: {
+            **summarize(results[scenario.name]['latencies'],
+                        results[scenario.name]['statuses'],
+                        scenario.status,
+                        sum(results[scenario.name]['latencies'])),
+            'queries': results[scenario.name]['queries'],
+            'budget': scenario.budget,
+        }
+        for scenario in scenarios
+    }
+
+
+def wait_for_port(port, process):
+    deadline = time.monotonic() + GUNICORN_START_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError('gunicorn завершился при запуске.')
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'gunicorn не открыл порт {port}.')
+
+
+@contextmanager
+def run_gunicorn(workers, port, server='wsgi'):
+    """Запускает локальный gunicorn с несколькими воркерами.
+
+    Приложение и класс воркеров выбирает gunicorn.conf.py по SERVER_MODE.
+    """
+    process = subprocess.Popen(
+        (sys.executable, '-m', 'gunicorn',
+         '--workers', str(workers), '--bind', f'127.0.0.1:{port}',
+         '--log-level', 'warning'),
+        cwd=settings.BASE_DIR,
+        env={**os.environ, 'SERVER_MODE': server}
+    )
+    try:
+        wait_for_port(port, process)
+        yield f'http://127.0.0.1:{port}'
+    finally:
+        process.terminate()
+        process.wait()
+
+
+@contextmanager
+def hold_slow_clients(port, count):
+    """Держит count соединений с недописанным запросом, как медленные клиенты.
+
+    Синхронный воркер gunicorn ждёт конца заголовков и не принимает
+    других запросов; воркер uvicorn продолжает обслуживать остальных.
+    """
+    with ExitStack() as stack:
+        for _ in range(count):
+            client = stack.enter_context(
+                socket.create_connection(('127.0.0.1', port))
+            )
+            client.sendall(b'GET /api/tags/ HTTP/1.1\r\nHost: localhost\r\n')
+        yield
+
+
+class NoRedirectHandler(HTTPRedirectHandler):
+    """Редирект — это ответ сценария, переходить по нему не нужно."""
+
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+opener = build_opener(NoRedirectHandler)
+
+
+def http_request(url, headers):
+    started = perf_counter()
+    try:
+        with opener.open(Request(url, headers=headers),
+                         timeout=HTTP_TIMEOUT) as response:
+            response.read()
+            status = response.status
+    except HTTPError as error:
+        status = error.code
+    except OSError:
+        status = None
+    return perf_counter() - started, status
+
+
+def run_http(scenarios, context, base_url, requests, concurrency):
+    """Нагружает сервер безопасными сценариями в concurrency потоков."""
+    results = {}
+    for scenario in scenarios:
+        if not scenario.safe:
+            continue
+        headers = {}
+        if scenario.auth:
+            headers['Authorization'] = f'Token {context["token"]}'
+        # Параметры, уже закодированные в сценарии, не кодируются дважды.
+        url = base_url + quote(scenario.get_path(context), safe='/?=&%')
+        started = perf_counter()
+        with ThreadPoolExecutor(concurrency) as executor:
+            measurements = list(executor.map(
+                lambda _: http_request(url, headers), range(requests)
+            ))
+        elapsed = perf_counter() - started
+        results[scenario.name] = summarize(
+            [latency for latency, _ in measurements],
+            [status for _, status in measurements],
+            scenario.status, elapsed
+        )
+    return results
+
+
+def find_budget_failures(client_results):
+    return [
+        {'scenario': name, 'queries': result['queries'],
+         'budget': result['budget']}
+        for name, result in client_results.items()
+        if result['queries'] > result['budget']
+    ]
+
+
+def write_report(report, output):
+    with open(output, mode='w', encoding='utf-8') as file:
+        json.dump(report, file, ensure_ascii=False, indent=2)
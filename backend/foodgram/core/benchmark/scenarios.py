@@ -0,0 +1,215 @@
+from base64 import b64encode
+from urllib.parse import quote, urlencode
+
+from django.conf import settings
+from rest_framework.settings import api_settings
+
+from recipes.models import Favorite, Recipe, ShoppingCart
+from recipes.short_links import encode_id
+from users.models import Subscription
+
+from .seed import BENCH_PASSWORD, get_bench_users
+
+FREE_RECIPES_COUNT = 5
+# Глубина ленты, на которой сравниваются постраничная и курсорная
+# пагинация; на небольшом наборе данных берётся последняя страница.
+DEEP_PAGE = 5000
+
+
+class Scenario:
+    """Один запрос к API и бюджет запросов к базе для него.
+
+    Бюджет берётся из QUERY_BUDGETS по действию представления, как у
+    QueryProfilingMiddleware; более дешёвые варианты действия (анонимный
+    список, курсор) могут задать свой, более строгий бюджет.
+    В path и data подставляются значения из контекста (build_context).
+    Небезопасные сценарии идут парами «добавить/удалить», чтобы каждая
+    итерация начиналась с одинакового состояния.
+    """
+
+    def __init__(self, name, path, action, budget=None, method='get',
+                 auth=True, data=None, status=200):
+        self.name = name
+        self.path = path
+        self.action = action
+        self.strict_budget = budget
+        self.method = method
+        self.auth = auth
+        self.data = data
+        self.status = status
+
+    @property
+    def budget(self):
+        budget = settings.QUERY_BUDGETS[self.action]
+        if self.strict_budget is None:
+            return budget
+        return min(budget, self.strict_budget)
+
+    @property
+    def safe(self):
+        return self.method == 'get'
+
+    def get_path(self, context):
+        return self.path.format(**context)
+
+    def get_data(self, context):
+        return self.data(context) if callable(self.data) else self.data
+
+
+def encode_cursor(position):
+    """Параметр cursor, как его строит RecipeCursorPagination."""
+    if position is None:
+        return ''
+    return quote(b64encode(urlencode({'p': position}).encode()).decode(),
+                 safe='')
+
+
+def get_deep_page():
+    """Номер глубокой страницы и курсор, указывающий на неё же."""
+    page_size = api_settings.PAGE_SIZE
+    page = max(1, min(DEEP_PAGE, -(-Recipe.objects.count() // page_size)))
+    offset = (page - 1) * page_size
+    position = None
+    if offset:
+        position = str(Recipe.objects.order_by(
+            '-created_at', '-id'
+        ).values_list('created_at', flat=True)[offset - 1])
+    return page, encode_cursor(position)
+
+
+def build_context():
+    """Пользователь и объекты, с которыми работают сценарии."""
+    user = get_bench_users().order_by('id').first()
+    if user is None:
+        raise ValueError('Нет данных для теста: запустите с --seed.')
+    own_recipe = Recipe.objects.filter(author=user).prefetch_related(
+        'tags', 'recipe_ingredients'
+    ).first()
+    busy_recipes = set(Favorite.objects.filter(author=user).values_list(
+        'recipe_id', flat=True
+    )) | set(ShoppingCart.objects.filter(author=user).values_list(
+        'recipe_id', flat=True
+    ))
+    free_recipes = list(Recipe.objects.exclude(author=user).exclude(
+        id__in=busy_recipes
+    ).values_list('id', flat=True)[:FREE_RECIPES_COUNT])
+    author = get_bench_users().exclude(id=user.id).exclude(
+        id__in=Subscription.objects.filter(user=user).values('author_id')
+    ).first()
+    deep_page, deep_cursor = get_deep_page()
+    return {
+        'user': user,
+        'token': user.auth_token.key,
+        'recipe': free_recipes[0],
+        'short_code': encode_id(free_recipes[0]),
+        'free_recipe': free_recipes[0],
+        'free_recipes': free_recipes,
+        'own_recipe': own_recipe.id,
+        'own_recipe_data': {
+            'tags': [tag.id for tag in own_recipe.tags.all()],
+            'ingredients': [
+                {'id': recipe_ingredient.ingredient_id,
+                 'amount': recipe_ingredient.amount}
+                for recipe_ingredient in own_recipe.recipe_ingredients.all()
+            ],
+        },
+        'author': author.id,
+        'ingredient': own_recipe.recipe_ingredients.all()[0].ingredient_id,
+        'tag': own_recipe.tags.all()[0].id,
+        'email': user.email,
+        'deep_page': deep_page,
+        'deep_cursor': deep_cursor,
+    }
+
+
+def bulk_ids(context):
+    return {'ids': context['free_recipes']}
+
+
+# Не входят в набор: создание и удаление рецепта, аватар, смена пароля
+# и выход — они меняют данные необратимо или пишут файлы.
+SCENARIOS = (
+    Scenario('ingredients-list', '/api/ingredients/',
+             'IngredientsViewSet.list', auth=False),
+    Scenario('ingredients-search', '/api/ingredients/?name=ингр',
+             'IngredientsViewSet.list', auth=False),
+    Scenario('ingredients-detail', '/api/ingredients/{ingredient}/',
+             'IngredientsViewSet.retrieve', auth=False),
+    Scenario('tags-list', '/api/tags/', 'TagsViewSet.list', auth=False),
+    Scenario('tags-detail', '/api/tags/{tag}/', 'TagsViewSet.retrieve',
+             auth=False),
+    Scenario('recipes-list-anonymous', '/api/recipes/', 'RecipeViewSet.list',
+             budget=5, auth=False),
+    Scenario('recipes-detail-anonymous', '/api/recipes/{recipe}/',
+             'RecipeViewSet.retrieve', budget=4, auth=False),
+    Scenario('recipes-list', '/api/recipes/', 'RecipeViewSet.list'),
+    Scenario('recipes-list-tags', '/api/recipes/?tags=breakfast&tags=lunch',
+             'RecipeViewSet.list'),
+    Scenario('recipes-list-favorited', '/api/recipes/?is_favorited=1',
+             'RecipeViewSet.list', budget=8),
+    Scenario('recipes-list-popular', '/api/recipes/?ordering=popular',
+             'RecipeViewSet.list', budget=8),
+    Scenario('recipes-list-cursor', '/api/recipes/?pagination=cursor',
+             'RecipeViewSet.list', budget=7),
+    Scenario('recipes-list-deep', '/api/recipes/?page={deep_page}',
+             'RecipeViewSet.list'),
+    Scenario('recipes-list-cursor-deep',
+             '/api/recipes/?pagination=cursor&cursor={deep_cursor}',
+             'RecipeViewSet.list', budget=7),
+    Scenario('recipes-search', '/api/recipes/?search=острый суп',
+             'RecipeViewSet.list'),
+    Scenario('recipes-search-typo', '/api/recipes/?search=гулящ',
+             'RecipeViewSet.list'),
+    Scenario('recipes-detail', '/api/recipes/{recipe}/',
+             'RecipeViewSet.retrieve'),
+    # Первый вызов строит индекс id рецептов, дальше запросов нет.
+    Scenario('recipes-get-link', '/api/recipes/{recipe}/get-link/',
+             'RecipeViewSet.get_short_link'),
+    # Существующий рецепт находится в индексе без запросов к базе.
+    Scenario('short-link-redirect', '/s/{short_code}/',
+             'get_redirect_short_code', budget=0, auth=False, status=302),
+    Scenario('short-link-redirect-legacy', '/s/{recipe}/',
+             'get_redirect_short_link', budget=0, auth=False, status=302),
+    Scenario('short-link-missing', '/s/zzzzzz/', 'get_redirect_short_code',
+             auth=False, status=404),
+    # Те же теги и ингредиенты: только чтение и проверка. Бюджет действия
+    # рассчитан на замену всех полей.
+    Scenario('recipes-update', '/api/recipes/{own_recipe}/',
+             'RecipeViewSet.partial_update', budget=16, method='patch',
+             data=lambda context: context['own_recipe_data']),
+    Scenario('download-shopping-cart',
+             '/api/recipes/download_shopping_cart/',
+             'RecipeViewSet.download_shopping_cart'),
+    Scenario('download-shopping-cart-pdf',
+             '/api/recipes/download_shopping_cart/?format=pdf',
+             'RecipeViewSet.download_shopping_cart'),
+    Scenario('favorite-add', '/api/recipes/{free_recipe}/favorite/',
+             'RecipeViewSet.favorite', method='post', status=201),
+    Scenario('favorite-remove', '/api/recipes/{free_recipe}/favorite/',
+             'RecipeViewSet.favorite', method='delete', status=204),
+    Scenario('shopping-cart-add', '/api/recipes/{free_recipe}/shopping_cart/',
+             'RecipeViewSet.shopping_cart', method='post', status=201),
+    Scenario('shopping-cart-remove',
+             '/api/recipes/{free_recipe}/shopping_cart/',
+             'RecipeViewSet.shopping_cart', method='delete', status=204),
+    Scenario('favorite-bulk-add', '/api/recipes/favorite/',
+             'RecipeViewSet.favorite_bulk', method='post', data=bulk_ids,
+             status=201),
+    Scenario('favorite-bulk-remove', '/api/recipes/favorite/',
+             'RecipeViewSet.favorite_bulk', method='delete', data=bulk_ids,
+             status=204),
+    Scenario('users-list', '/api/users/', 'UserViewSet.list'),
+    Scenario('users-detail', '/api/users/{author}/', 'UserViewSet.retrieve'),
+    Scenario('users-me', '/api/users/me/', 'UserViewSet.me'),
+    Scenario('subscriptions', '/api/users/subscriptions/',
+             'UserViewSet.subscriptions'),
+    Scenario('subscribe', '/api/users/{author}/subscribe/',
+             'UserViewSet.subscribe', method='post', status=201),
+    Scenario('unsubscribe', '/api/users/{author}/subscribe/',
+             'UserViewSet.subscribe', budget=5, method='delete',
+             status=204),
+    Scenario('token-login', '/api/auth/token/login/', 'TokenCreateView.post',
+             method='post', auth=False, data=lambda context: {
+                 'email': context['email'], 'password': BENCH_PASSWORD
+             }),
+)
@@ -0,0 +1,173 @@
+import random
+from io import BytesIO
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image
+from rest_framework.authtoken.models import Token
+
+from core.cache import bump_version_on_commit
+from core.counters import recount
+from recipes.constants import (
+    INGREDIENTS_VERSION,
+    RECIPE_IDS_VERSION,
+    RECIPES_VERSION,
+    TAGS_VERSION
+)
+from recipes.models import (
+    Favorite,
+    Ingredients,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    Tag
+)
+from recipes.search import update_search_vectors
+from users.models import Subscription, User
+
+BENCH_PREFIX = 'bench'
+BENCH_PASSWORD = 'bench-password'
+BATCH_SIZE = 1000
+# Рецепты создаются порциями по авторам, чтобы миллион рецептов
+# и их ингредиенты не держать в памяти одновременно.
+RECIPES_CHUNK_SIZE = 10000
+SYNTHETIC_INGREDIENTS = 500
+SYNTHETIC_TAGS = (('Завтрак', 'breakfast'), ('Обед', 'lunch'),
+                  ('Ужин', 'dinner'))
+# Словарь для названий и описаний, чтобы поиск находил разные рецепты.
+NAME_ADJECTIVES = ('Домашний', 'Быстрый', 'Летний', 'Острый', 'Сытный',
+                   'Постный', 'Праздничный', 'Лёгкий')
+NAME_DISHES = ('суп', 'борщ', 'салат', 'пирог', 'омлет', 'плов', 'рагу',
+               'гуляш', 'кекс', 'соус')
+TEXT_WORDS = ('нарезать', 'обжарить', 'запечь', 'посолить', 'перемешать',
+              'варить', 'тушить', 'подать', 'охладить', 'взбить', 'духовка',
+              'сковорода', 'кастрюля', 'минут', 'зелень', 'сливки', 'чеснок')
+TEXT_LENGTH = 12
+
+
+def get_bench_users():
+    return User.objects.filter(username__startswith=f'{BENCH_PREFIX}_')
+
+
+def get_image_name():
+    """Одно изображение на все рецепты: файлы не копируются."""
+    buffer = BytesIO()
+    Image.new('RGB', (800, 600), 'orange').save(buffer, 'JPEG')
+    return default_storage.save(f'recipes/{BENCH_PREFIX}.jpg',
+                                ContentFile(buffer.getvalue()))
+
+
+def sample(generator, population, size):
+    return generator.sample(population, min(size, len(population)))
+
+
+def create_recipes(generator, authors, recipes_per_user, ingredient_ids,
+                   tag_ids, ingredients_per_recipe, tags_per_recipe,
+                   image_name):
+    """Рецепты авторов с тегами и ингредиентами; возвращает их id."""
+    recipes = Recipe.objects.bulk_create(
+        (Recipe(author=author,
+                name='{} {} {}-{}'.format(
+                    generator.choice(NAME_ADJECTIVES),
+                    generator.choice(NAME_DISHES), author.id, number
+                ),
+                text=' '.join(generator.choices(TEXT_WORDS, k=TEXT_LENGTH)),
+                cooking_time=generator.randint(5, 120), image=image_name)
+         for author in authors for number in range(recipes_per_user)),
+        batch_size=BATCH_SIZE
+    )
+    Recipe.tags.through.objects.bulk_create(
+        (Recipe.tags.through(recipe_id=recipe.id, tag_id=tag_id)
+         for recipe in recipes
+         for tag_id in sample(generator, tag_ids, tags_per_recipe)),
+        batch_size=BATCH_SIZE
+    )
+    RecipeIngredient.objects.bulk_create(
+        (RecipeIngredient(recipe=recipe, ingredient_id=ingredient_id,
+                          amount=generator.randint(1, 500))
+         for recipe in recipes
+         for ingredient_id in sample(generator, ingredient_ids,
+                                     ingredients_per_recipe)),
+        batch_size=BATCH_SIZE
+    )
+    update_search_vectors(Recipe.objects.filter(author__in=authors))
+    return [recipe.id for recipe in recipes]
+
+
+def ensure_catalog():
+    """Справочники из import_* или синтетические, если база пуста."""
+    if not Ingredients.objects.exists():
+        Ingredients.objects.bulk_create(
+            (Ingredients(name=f'ингредиент {number}', measurement_unit='г')
+             for number in range(SYNTHETIC_INGREDIENTS)),
+            batch_size=BATCH_SIZE
+        )
+    if not Tag.objects.exists():
+        Tag.objects.bulk_create(
+            Tag(name=name, slug=slug) for name, slug in SYNTHETIC_TAGS
+        )
+    return (list(Ingredients.objects.values_list('id', flat=True)),
+            list(Tag.objects.values_list('id', flat=True)))
+
+
+@transaction.atomic
+def seed(users=50, recipes_per_user=20, ingredients_per_recipe=8,
+         tags_per_recipe=2, favorites_per_user=30, cart_per_user=10,
+         subscriptions_per_user=10, random_seed=0):
+    """Пересоздаёт синтетический набор данных пачками bulk_create.
+
+    Сигналы при этом не отправляются, поэтому счётчики пересчитываются,
+    а поколения кешей сдвигаются в конце.
+    """
+    generator = random.Random(random_seed)
+    get_bench_users().delete()
+    ingredient_ids, tag_ids = ensure_catalog()
+    password = make_password(BENCH_PASSWORD)
+    authors = User.objects.bulk_create(
+        (User(username=f'{BENCH_PREFIX}_{number}',
+              email=f'{BENCH_PREFIX}_{number}@example.com',
+              first_name='Имя', last_name='Фамилия', password=password)
+         for number in range(users)),
+        batch_size=BATCH_SIZE
+    )
+    Token.objects.bulk_create(
+        Token(key=Token.generate_key(), user=author) for author in authors
+    )
+    image_name = get_image_name()
+    recipe_ids = []
+    chunk = max(1, RECIPES_CHUNK_SIZE // max(1, recipes_per_user))
+    for start in range(0, len(authors), chunk):
+        recipe_ids.extend(create_recipes(
+            generator, authors[start:start + chunk], recipes_per_user,
+            ingredient_ids, tag_ids, ingredients_per_recipe,
+            tags_per_recipe, image_name
+        ))
+    for model, per_user in ((Favorite, favorites_per_user),
+                            (ShoppingCart, cart_per_user)):
+        model.objects.bulk_create(
+            (model(author=author, recipe_id=recipe_id)
+             for author in authors
+             for recipe_id in sample(generator, recipe_ids, per_user)),
+            batch_size=BATCH_SIZE
+        )
+    Subscription.objects.bulk_create(
+        (Subscription(user=author, author=followed)
+         for author in authors
+         for followed in sample(generator, authors,
+                                subscriptions_per_user + 1)
+         if followed != author),
+        batch_size=BATCH_SIZE
+    )
+    recount(Recipe, Ingredients, Tag, User, RecipeIngredient, Favorite,
+            ShoppingCart, Subscription)
+    for version in (INGREDIENTS_VERSION, TAGS_VERSION, RECIPES_VERSION,
+                    RECIPE_IDS_VERSION):
+        bump_version_on_commit(version)
+    return {
+        'users': len(authors),
+        'recipes': len(recipe_ids),
+        'ingredients': len(ingredient_ids),
+        'tags': len(tag_ids),
+    }
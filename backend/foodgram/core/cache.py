@@ -0,0 +1,42 @@
+from functools import partial
+from time import time_ns
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+VERSION_KEY = 'version:{}'
+
+
+def new_version():
+    # Не счётчик: поколение, созданное заново после истечения ключа
+    # или в другом процессе, не совпадает ни с одним из прежних.
+    return time_ns()
+
+
+def get_version(name):
+    """Текущее поколение данных name в общем кеше."""
+    return cache.get_or_set(VERSION_KEY.format(name), new_version,
+                            timeout=settings.CACHE_VERSION_TIMEOUT)
+
+
+def bump_version(name):
+    """Сдвигает поколение name — все закешированные копии устаревают.
+
+    Поколение перезаписывается, а не увеличивается через incr:
+    у FileBasedCache incr — это неатомарные get и set, и одновременные
+    сдвиги могли бы слиться в один.
+    """
+    version = new_version()
+    cache.set(VERSION_KEY.format(name), version,
+              timeout=settings.CACHE_VERSION_TIMEOUT)
+    return version
+
+
+def bump_version_on_commit(name):
+    """Сдвигает поколение name после коммита текущей транзакции.
+
+    Иначе параллельный запрос успеет закешировать старые данные
+    под новым поколением.
+    """
+    transaction.on_commit(partial(bump_version, name))
@@ -0,0 +1,61 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+class CounterFieldsMixin:
+    """Не перезаписывает счётчики при обычном save() модели.
+
+    Счётчики меняются только через change_counter(), поэтому значения,
+    прочитанные вместе с объектом, к моменту сохранения могут устареть.
+    """
+
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if (not self._state.adding and not args
+                and kwargs.get('update_fields') is None):
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.counter_fields
+                and field.attname not in deferred
+            ]
+        super().save(*args, **kwargs)
+
+
+def change_counter(queryset, field, delta):
+    """Атомарно сдвигает счётчик field у строк queryset на delta."""
+    if delta:
+        queryset.update(**{field: F(field) + delta})
+
+
+def count_related(model, field):
+    """Подзапрос: число строк model, ссылающихся полем field на OuterRef."""
+    return Coalesce(Subquery(
+        model.objects.filter(
+            **{field: OuterRef('pk')}
+        ).order_by().values(field).annotate(
+            count=Count('pk')
+        ).values('count')
+    ), 0)
+
+
+def recount(recipe, ingredients, tag, user, recipe_ingredient, favorite,
+            shopping_cart, subscription):
+    """Пересчитывает все счётчики по текущим данным."""
+    recipe.objects.update(
+        favorites_count=count_related(favorite, 'recipe'),
+        cart_count=count_related(shopping_cart, 'recipe')
+    )
+    ingredients.objects.update(
+        recipes_count=count_related(recipe_ingredient, 'ingredient')
+    )
+    tag.objects.update(
+        recipes_count=count_related(recipe.tags.through, 'tag')
+    )
+    user.objects.update(
+        recipes_count=count_related(recipe, 'author'),
+        subscribers_count=count_related(subscription, 'author'),
+        subscriptions_count=count_related(subscription, 'user')
+    )
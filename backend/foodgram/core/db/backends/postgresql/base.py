@@ -0,0 +1,76 @@
+from threading import Lock
+
+from django.db.backends.postgresql import base
+
+from core.db.pool import ConnectionPool
+from core.profiling import profile_execute
+
+pools = {}
+pools_lock = Lock()
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """PostgreSQL с проверкой переиспользуемых соединений и пулом.
+
+    CONN_HEALTH_CHECKS: перед первым запросом в рамках HTTP-запроса
+    постоянное соединение проверяется и при необходимости пересоздаётся.
+    OPTIONS['pool']: соединения берутся из ConnectionPool процесса
+    и возвращаются в него вместо закрытия.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.health_check_done = False
+        self.execute_wrappers.append(profile_execute)
+
+    @property
+    def pool_options(self):
+        return self.settings_dict['OPTIONS'].get('pool')
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop('pool', None)
+        return params
+
+    def get_pool(self, conn_params):
+        with pools_lock:
+            if self.alias not in pools:
+                pools[self.alias] = ConnectionPool(
+                    connect=lambda: super(
+                        DatabaseWrapper, self
+                    ).get_new_connection(conn_params),
+                    check=self.settings_dict.get('CONN_HEALTH_CHECKS', False),
+                    **self.pool_options
+                )
+            return pools[self.alias]
+
+    def get_new_connection(self, conn_params):
+        # Новое соединение в проверке не нуждается.
+        self.health_check_done = True
+        if not self.pool_options:
+            return super().get_new_connection(conn_params)
+        connection = self.get_pool(conn_params).acquire()
+        options = self.settings_dict['OPTIONS']
+        self.isolation_level = options.get(
+            'isolation_level', connection.isolation_level
+        )
+        return connection
+
+    def _close(self):
+        if self.connection is not None and self.pool_options:
+            with self.wrap_database_errors:
+                return pools[self.alias].release(self.connection)
+        return super()._close()
+
+    def ensure_connection(self):
+        if (self.connection is not None
+                and self.settings_dict.get('CONN_HEALTH_CHECKS')
+                and not self.health_check_done):
+            if not self.is_usable():
+                self.close()
+            self.health_check_done = True
+        super().ensure_connection()
+
+    def close_if_unusable_or_obsolete(self):
+        super().close_if_unusable_or_obsolete()
+        self.health_check_done = False
@@ -0,0 +1,70 @@
+import time
+from collections import deque
+from threading import BoundedSemaphore, Lock
+
+from django.db import OperationalError
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+
+
+class ConnectionPool:
+    """Пул соединений psycopg2 одного процесса.
+
+    max_size ограничивает число выданных соединений, timeout — ожидание
+    свободного места, max_idle — сколько секунд соединение может лежать
+    в пуле, прежде чем его закроют вместо повторного использования.
+    При check=True соединение из пула проверяется запросом SELECT 1.
+    """
+
+    def __init__(self, connect, max_size, timeout, max_idle, check=False):
+        self.connect = connect
+        self.check = check
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.idle = deque()
+        self.lock = Lock()
+        self.slots = BoundedSemaphore(max_size)
+
+    def acquire(self):
+        if not self.slots.acquire(timeout=self.timeout):
+            raise OperationalError(
+                f'Нет свободных соединений в пуле за {self.timeout} с.'
+            )
+        try:
+            while True:
+                with self.lock:
+                    if not self.idle:
+                        break
+                    connection, released_at = self.idle.pop()
+                if (not connection.closed
+                        and time.monotonic() - released_at < self.max_idle
+                        and self.is_usable(connection)):
+                    return connection
+                connection.close()
+            return self.connect()
+        except BaseException:
+            self.slots.release()
+            raise
+
+    def is_usable(self, connection):
+        if not self.check:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            if not connection.autocommit:
+                connection.rollback()
+        except Exception:
+            return False
+        return True
+
+    def release(self, connection):
+        try:
+            if (not connection.closed and connection.get_transaction_status()
+                    != TRANSACTION_STATUS_IDLE):
+                connection.rollback()
+        except Exception:
+            connection.close()
+        if not connection.closed:
+            with self.lock:
+                self.idle.append((connection, time.monotonic()))
+        self.slots.release()
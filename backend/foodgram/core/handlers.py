@@ -0,0 +1,53 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.handlers.asgi import ASGIHandler as DjangoASGIHandler
+
+END = object()
+
+
+class ASGIHandler(DjangoASGIHandler):
+    """ASGI-обработчик, который не читает потоковый ответ в цикле событий.
+
+    Django 3.2 перебирает streaming_content прямо в цикле событий, где ORM
+    недоступен. Здесь каждая часть запрашивается в отдельном потоке
+    ответа: серверный курсор (QuerySet.iterator()) остаётся в одном
+    соединении, а в памяти одновременно лежит только одна часть.
+    Там же ответ закрывается: сигнал request_finished закрывает
+    соединение этого потока.
+    """
+
+    async def send_response(self, response, send):
+        if not response.streaming:
+            return await super().send_response(response, send)
+        headers = [
+            (header.encode('ascii'), value.encode('latin1'))
+            for header, value in response.items()
+        ]
+        headers.extend(
+            (b'Set-Cookie', cookie.output(header='').encode('ascii').strip())
+            for cookie in response.cookies.values()
+        )
+        await send({
+            'type': 'http.response.start',
+            'status': response.status_code,
+            'headers': headers,
+        })
+        loop = asyncio.get_running_loop()
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            try:
+                parts = await loop.run_in_executor(executor, iter, response)
+                while True:
+                    part = await loop.run_in_executor(executor, next,
+                                                      parts, END)
+                    if part is END:
+                        break
+                    for chunk, _ in self.chunk_bytes(part):
+                        await send({
+                            'type': 'http.response.body',
+                            'body': chunk,
+                            'more_body': True,
+                        })
+                await send({'type': 'http.response.body'})
+            finally:
+                await loop.run_in_executor(executor, response.close)
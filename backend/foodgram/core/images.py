@@ -0,0 +1,138 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from django.dispatch import Signal
+from PIL import Image, ImageOps
+
+executor = None
+
+VARIANT_EXTENSIONS = {'WEBP': 'webp', 'JPEG': 'jpg'}
+
+# Копии записываются через update(), поэтому post_save не отправляется.
+variants_saved = Signal()
+
+
+def render_variants(source, sizes, image_format, quality):
+    """Готовит уменьшенные копии изображения без метаданных.
+
+    Выполняется в отдельном процессе, поэтому не обращается к Django:
+    получает путь к файлу или байты, возвращает байты копий и размеры
+    оригинала.
+    """
+    if not isinstance(source, str):
+        source = BytesIO(source)
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image)
+        width, height = image.size
+        mode = 'RGBA' if image_format == 'WEBP' else 'RGB'
+        image = image.convert(mode)
+        variants = {}
+        for name, size in sizes.items():
+            variant = image.copy()
+            variant.thumbnail(size)
+            buffer = BytesIO()
+            variant.save(buffer, image_format, quality=quality)
+            variants[name] = buffer.getvalue()
+    return {'width': width, 'height': height, 'variants': variants}
+
+
+def get_executor():
+    global executor
+    if executor is None:
+        executor = ProcessPoolExecutor(
+            max_workers=settings.IMAGE_PROCESSING_WORKERS
+        )
+    return executor
+
+
+def get_source(field_file):
+    try:
+        return field_file.storage.path(field_file.name)
+    except NotImplementedError:
+        with field_file.open('rb') as file:
+            return file.read()
+
+
+def delete_variants(storage, variants):
+    for name in settings.IMAGE_VARIANT_SIZES:
+        if variants.get(name):
+            storage.delete(variants[name])
+
+
+def save_variants(instance, field_name, variants_field, source_name, result):
+    """Сохраняет копии рядом с оригиналом и записывает их в модель."""
+    storage = getattr(instance, field_name).storage
+    directory, filename = os.path.split(source_name)
+    stem = os.path.splitext(filename)[0]
+    extension = VARIANT_EXTENSIONS[settings.IMAGE_VARIANT_FORMAT]
+    variants = {
+        'source': source_name,
+        'width': result['width'],
+        'height': result['height'],
+    }
+    for name, content in result['variants'].items():
+        variants[name] = storage.save(
+            os.path.join(directory, 'variants', f'{stem}_{name}.{extension}'),
+            ContentFile(content)
+        )
+    updated = type(instance).objects.filter(
+        pk=instance.pk, **{field_name: source_name}
+    ).update(**{variants_field: variants})
+    if not updated:
+        # Изображение успели заменить — эти копии уже не нужны.
+        delete_variants(storage, variants)
+        return
+    delete_variants(storage, getattr(instance, variants_field))
+    setattr(instance, variants_field, variants)
+    variants_saved.send(sender=type(instance), instance=instance)
+
+
+def process_image(instance, field_name, variants_field):
+    field_file = getattr(instance, field_name)
+    source_name = field_file.name
+    arguments = (
+        get_source(field_file), settings.IMAGE_VARIANT_SIZES,
+        settings.IMAGE_VARIANT_FORMAT, settings.IMAGE_VARIANT_QUALITY
+    )
+    if not settings.IMAGE_PROCESSING_WORKERS:
+        save_variants(instance, field_name, variants_field, source_name,
+                      render_variants(*arguments))
+        return
+
+    def done(future):
+        # Колбэк выполняется в служебном потоке пула процессов.
+        try:
+            save_variants(instance, field_name, variants_field, source_name,
+                          future.result())
+        finally:
+            connection.close()
+
+    get_executor().submit(render_variants, *arguments).add_done_callback(
+        done
+    )
+
+
+def schedule_image_variants(instance, field_name, variants_field):
+    """Ставит в очередь обработку изображения, если оно изменилось.
+
+    Вызывается из post_save: копии строятся после коммита транзакции
+    и вне потока запроса, если IMAGE_PROCESSING_WORKERS больше нуля.
+    """
+    field_file = getattr(instance, field_name)
+    variants = getattr(instance, variants_field)
+    if variants.get('source') == (field_file.name or None):
+        return
+    if not field_file:
+        delete_variants(field_file.storage, variants)
+        type(instance).objects.filter(pk=instance.pk).update(
+            **{variants_field: {}}
+        )
+        setattr(instance, variants_field, {})
+        return
+    transaction.on_commit(
+        lambda: process_image(instance, field_name, variants_field)
+    )
@@ -0,0 +1,252 @@
+import csv
+import json
+import re
+from contextlib import nullcontext
+from itertools import islice
+from time import perf_counter
+
+from django.core.management import BaseCommand
+from django.db import connection, transaction
+from psycopg2.extras import execute_values
+
+from core.cache import bump_version
+
+IMPORT_BATCH_SIZE = 1000
+JSON_CHUNK_SIZE = 64 * 1024
+JSON_SEPARATOR = re.compile(r'[\s,]*')
+
+UPSERT_SQL = '''
+INSERT INTO {table} AS current ({columns}) VALUES %s
+ON CONFLICT ({key_columns}) {action}
+RETURNING xmax = 0
+'''
+UPDATE_ACTION = '''DO UPDATE SET {assignments}
+WHERE ({update_columns}) IS DISTINCT FROM ({excluded_columns})'''
+# Ключ без уникального ограничения: обновляются строки, у которых ключ
+# однозначен, вставляются строки с ещё не встречавшимся ключом.
+MATCH_SQL = '''
+WITH source ({columns}) AS (VALUES %s),
+updated AS (
+    UPDATE {table} AS current SET {assignments}
+    FROM source
+    WHERE {key_match}
+    AND ({update_columns}) IS DISTINCT FROM ({source_columns})
+    AND NOT EXISTS (
+        SELECT 1 FROM {table} AS other
+        WHERE {other_key_match} AND other.{pk} <> current.{pk}
+    )
+    RETURNING 1
+),
+inserted AS (
+    INSERT INTO {table} ({columns})
+    SELECT {columns} FROM source
+    WHERE NOT EXISTS (SELECT 1 FROM {table} AS current WHERE {key_match})
+    ON CONFLICT DO NOTHING
+    RETURNING 1
+)
+SELECT (SELECT count(*) FROM inserted), (SELECT count(*) FROM updated)
+'''
+
+
+def read_csv(file_path, fields):
+    """Построчно читает CSV без заголовка в словари с ключами fields."""
+    with open(file_path, mode='r', encoding='utf-8', newline='') as file:
+        for row in csv.reader(file):
+            yield dict(zip(fields, row))
+
+
+def read_json(file_path):
+    """Читает JSON-массив объектов по одному, не загружая файл целиком."""
+    decoder = json.JSONDecoder()
+    with open(file_path, mode='r', encoding='utf-8') as file:
+        buffer = file.read(JSON_CHUNK_SIZE).lstrip()
+        if not buffer.startswith('['):
+            raise ValueError(f'{file_path}: ожидался JSON-массив.')
+        position = 1
+        end_of_file = False
+        while True:
+            position = JSON_SEPARATOR.match(buffer, position).end()
+            if buffer.startswith(']', position):
+                return
+            try:
+                row, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if end_of_file:
+                    raise
+                chunk = file.read(JSON_CHUNK_SIZE)
+                end_of_file = not chunk
+                buffer = buffer[position:] + chunk
+                position = 0
+                continue
+            yield row
+
+
+class Importer:
+    """Идемпотентная загрузка справочника пачками через upsert.
+
+    Строки сопоставляются с существующими по key_fields, у найденных
+    обновляются update_fields. Без update_fields совпавшие строки
+    пропускаются. Если key_fields — не уникальное ограничение модели
+    (unique_key=False), вместо ON CONFLICT строки сопоставляются запросом,
+    и неоднозначный ключ (несколько строк в базе) тоже пропускается.
+    Каждая пачка фиксируется отдельной транзакцией.
+    """
+
+    def __init__(self, model, key_fields, update_fields=(), versions=(),
+                 unique_key=True):
+        self.model = model
+        self.key_fields = key_fields
+        self.update_fields = update_fields
+        self.versions = versions
+        self.unique_key = unique_key
+        self.fields = [
+            field for field in model._meta.concrete_fields
+            if not field.primary_key
+        ]
+
+    def clean(self, row):
+        """Значения полей строки или None, если строка неполная."""
+        if not isinstance(row, dict):
+            return None
+        values = {}
+        for name in (*self.key_fields, *self.update_fields):
+            value = row.get(name)
+            value = str(value).strip() if value is not None else ''
+            if not value:
+                return None
+            values[name] = value
+        return values
+
+    def get_sql(self):
+        quote_name = connection.ops.quote_name
+        column = {
+            field.name: quote_name(field.column) for field in self.fields
+        }
+        if not self.unique_key:
+            return self.get_match_sql(column)
+        if self.update_fields:
+            action = UPDATE_ACTION.format(
+                assignments=', '.join(
+                    f'{column[name]} = EXCLUDED.{column[name]}'
+                    for name in self.update_fields
+                ),
+                update_columns=', '.join(
+                    f'current.{column[name]}' for name in self.update_fields
+                ),
+                excluded_columns=', '.join(
+                    f'EXCLUDED.{column[name]}' for name in self.update_fields
+                )
+            )
+        else:
+            action = 'DO NOTHING'
+        return UPSERT_SQL.format(
+            table=quote_name(self.model._meta.db_table),
+            columns=', '.join(column[field.name] for field in self.fields),
+            key_columns=', '.join(column[name] for name in self.key_fields),
+            action=action
+        )
+
+    def get_match_sql(self, column):
+        def match(alias):
+            return ' AND '.join(
+                f'{alias}.{column[name]} = source.{column[name]}'
+                for name in self.key_fields
+            )
+
+        return MATCH_SQL.format(
+            table=connection.ops.quote_name(self.model._meta.db_table),
+            columns=', '.join(column[field.name] for field in self.fields),
+            assignments=', '.join(
+                f'{column[name]} = source.{column[name]}'
+                for name in self.update_fields
+            ),
+            update_columns=', '.join(
+                f'current.{column[name]}' for name in self.update_fields
+            ),
+            source_columns=', '.join(
+                f'source.{column[name]}' for name in self.update_fields
+            ),
+            key_match=match('current'),
+            other_key_match=match('other'),
+            pk=connection.ops.quote_name(self.model._meta.pk.column)
+        )
+
+    def write_batch(self, rows):
+        """Записывает пачку, возвращает число вставленных и обновлённых."""
+        values = [
+            tuple(
+                row[field.name] if field.name in row else field.get_default()
+                for field in self.fields
+            )
+            for row in rows
+        ]
+        with connection.cursor() as cursor:
+            result = execute_values(cursor.cursor, self.get_sql(), values,
+                                    page_size=len(values), fetch=True)
+        if not self.unique_key:
+            (inserted, updated), = result
+            return inserted, updated
+        inserted = sum(1 for (is_inserted,) in result if is_inserted)
+        return inserted, len(result) - inserted
+
+    def run(self, rows, batch_size=IMPORT_BATCH_SIZE, dry_run=False):
+        stats = {'inserted': 0, 'updated': 0, 'skipped': 0}
+        started = perf_counter()
+        rows = iter(rows)
+        try:
+            # --dry-run откатывает файл целиком, поэтому пачки идут в одной
+            # внешней транзакции; иначе ошибка в середине файла оставляет
+            # записанными уже зафиксированные пачки.
+            with transaction.atomic() if dry_run else nullcontext():
+                while True:
+                    batch = list(islice(rows, batch_size))
+                    if not batch:
+                        break
+                    with transaction.atomic():
+                        self.write_unique(batch, stats)
+                if dry_run:
+                    transaction.set_rollback(True)
+        finally:
+            if not dry_run and (stats['inserted'] or stats['updated']):
+                for version in self.versions:
+                    bump_version(version)
+        stats['seconds'] = perf_counter() - started
+        return stats
+
+    def write_unique(self, batch, stats):
+        # Повтор ключа в одной пачке ON CONFLICT не допускает.
+        unique = {}
+        for row in map(self.clean, batch):
+            if row is not None:
+                unique[tuple(row[name] for name in self.key_fields)] = row
+        stats['skipped'] += len(batch) - len(unique)
+        if unique:
+            inserted, updated = self.write_batch(list(unique.values()))
+            stats['inserted'] += inserted
+            stats['updated'] += updated
+            stats['skipped'] += len(unique) - inserted - updated
+
+
+class BaseImportCommand(BaseCommand):
+    """Команда загрузки справочника с общими опциями и отчётом."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=IMPORT_BATCH_SIZE,
+            help='Количество строк в одном запросе.'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Выполнить загрузку и откатить транзакцию.'
+        )
+
+    def import_rows(self, importer, rows, file_path, options):
+        stats = importer.run(rows, batch_size=options['batch_size'],
+                             dry_run=options['dry_run'])
+        self.stdout.write(
+            '{prefix}{file_path}: добавлено {inserted}, обновлено {updated}, '
+            'пропущено {skipped} за {seconds:.2f} с'.format(
+                prefix='[dry-run] ' if options['dry_run'] else '',
+                file_path=file_path, **stats
+            )
+        )
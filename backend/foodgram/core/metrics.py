@@ -0,0 +1,70 @@
+import os
+from pathlib import Path
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess
+)
+
+# Если задана переменная окружения, метрики каждого воркера gunicorn
+# пишутся в файлы этой папки и суммируются при чтении /metrics.
+MULTIPROCESS_DIR_ENV = 'PROMETHEUS_MULTIPROC_DIR'
+
+# Гистограммы создают свои файлы уже при импорте, в том числе в командах
+# manage.py, которые запускаются без gunicorn и его on_starting.
+if os.getenv(MULTIPROCESS_DIR_ENV):
+    Path(os.getenv(MULTIPROCESS_DIR_ENV)).mkdir(parents=True, exist_ok=True)
+
+REQUEST_LATENCY = Histogram(
+    'foodgram_http_request_duration_seconds',
+    'Время обработки запроса.',
+    ('route', 'method'),
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+REQUESTS = Counter(
+    'foodgram_http_requests',
+    'Запросы по действиям представлений и классам статусов ответа.',
+    ('action', 'method', 'status')
+)
+DB_QUERIES = Histogram(
+    'foodgram_db_queries_per_request',
+    'Число запросов к базе за один HTTP-запрос.',
+    ('action',),
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+)
+DB_DURATION = Histogram(
+    'foodgram_db_duration_seconds',
+    'Суммарное время запросов к базе за один HTTP-запрос.',
+    ('action',),
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+)
+CACHE_REQUESTS = Counter(
+    'foodgram_cache_requests',
+    'Обращения к кешам процесса: попадания и промахи.',
+    ('cache', 'result')
+)
+IMAGE_UPLOAD_BYTES = Histogram(
+    'foodgram_image_upload_bytes',
+    'Размер загруженных изображений после декодирования base64.',
+    buckets=(16 * 1024, 64 * 1024, 256 * 1024, 1024 ** 2, 4 * 1024 ** 2,
+             10 * 1024 ** 2)
+)
+
+
+def get_status_class(status_code):
+    return f'{status_code // 100}xx'
+
+
+def render_metrics():
+    """Метрики в текстовом формате Prometheus и их content type."""
+    if os.getenv(MULTIPROCESS_DIR_ENV):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
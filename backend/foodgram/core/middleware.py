@@ -0,0 +1,139 @@
+import asyncio
+import json
+import logging
+from time import perf_counter
+
+from django.conf import settings
+
+from core.metrics import (
+    DB_DURATION,
+    DB_QUERIES,
+    REQUEST_LATENCY,
+    REQUESTS,
+    get_status_class
+)
+from core.profiling import QueryProfile, current_profile
+
+logger = logging.getLogger(__name__)
+
+
+def get_action(request):
+    """Имя действия вида «RecipeViewSet.list» для бюджета и логов."""
+    if request.resolver_match is None:
+        return None
+    view_func = request.resolver_match.func
+    view_class = getattr(view_func, 'cls', None)
+    if view_class is None:
+        return view_func.__name__
+    actions = getattr(view_func, 'actions', None) or {}
+    method = request.method.lower()
+    return f'{view_class.__name__}.{actions.get(method, method)}'
+
+
+class ProfileMiddleware:
+    """Middleware, которой нужен профиль запросов к базе.
+
+    Работает и в синхронной, и в асинхронной цепочке, чтобы под ASGI
+    не переключать каждый запрос в общий синхронный поток. Профиль
+    создаёт внешняя из таких middleware, остальные его переиспользуют.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Так Django узнаёт асинхронную middleware.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def start(self):
+        profile = current_profile.get()
+        if profile is not None:
+            return profile, None
+        profile = QueryProfile()
+        return profile, current_profile.set(profile)
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        profile, token = self.start()
+        started = perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            if token is not None:
+                current_profile.reset(token)
+        self.finish(request, response, profile, perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        profile, token = self.start()
+        started = perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            if token is not None:
+                current_profile.reset(token)
+        self.finish(request, response, profile, perf_counter() - started)
+        return response
+
+    def finish(self, request, response, profile, elapsed):
+        raise NotImplementedError
+
+
+class QueryProfilingMiddleware(ProfileMiddleware):
+    """Профилирование запросов к базе по действиям представлений.
+
+    Добавляет заголовок Server-Timing, пишет структурированный лог
+    и предупреждает о превышении бюджета из QUERY_BUDGETS.
+    """
+
+    def finish(self, request, response, profile, elapsed):
+        response['Server-Timing'] = (
+            'db;dur={:.1f};desc="{} queries", serializer;dur={:.1f}, '
+            'total;dur={:.1f}'.format(
+                1000 * profile.db_time, profile.queries,
+                1000 * profile.serializer_time, 1000 * elapsed
+            )
+        )
+        action = get_action(request)
+        budget = settings.QUERY_BUDGETS.get(action)
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'action': action,
+            'status': response.status_code,
+            'duration_ms': round(1000 * elapsed, 1),
+            'queries': profile.queries,
+            'db_ms': round(1000 * profile.db_time, 1),
+            'serializer_ms': round(1000 * profile.serializer_time, 1),
+            'serializer_queries': profile.serializer_queries,
+            'duplicates': profile.get_duplicates(),
+            'budget': budget,
+        }
+        if budget is not None and profile.queries > budget:
+            logger.warning(json.dumps(
+                {'event': 'query_budget_exceeded', **record},
+                ensure_ascii=False
+            ))
+        else:
+            logger.info(json.dumps({'event': 'request_profile', **record},
+                                   ensure_ascii=False))
+
+
+class MetricsMiddleware(ProfileMiddleware):
+    """Метрики Prometheus по маршрутам и действиям представлений."""
+
+    def finish(self, request, response, profile, elapsed):
+        resolver_match = request.resolver_match
+        REQUEST_LATENCY.labels(
+            resolver_match.view_name if resolver_match else 'unmatched',
+            request.method
+        ).observe(elapsed)
+        action = get_action(request) or 'unmatched'
+        REQUESTS.labels(
+            action, request.method, get_status_class(response.status_code)
+        ).inc()
+        DB_QUERIES.labels(action).observe(profile.queries)
+        DB_DURATION.labels(action).observe(profile.db_time)
@@ -0,0 +1,82 @@
+import re
+from collections import Counter
+from contextvars import ContextVar
+from time import perf_counter
+
+# Профиль текущего запроса; None, если профилирование выключено.
+current_profile = ContextVar('current_profile', default=None)
+
+PLACEHOLDERS_LIST = re.compile(r'%s(?:\s*,\s*%s)+')
+DUPLICATES_LIMIT = 5
+FINGERPRINT_MAX_LENGTH = 300
+
+
+def fingerprint(sql):
+    """Текст запроса без различий в длине списков IN (...)."""
+    return PLACEHOLDERS_LIST.sub('%s, ...', sql)
+
+
+class QueryProfile:
+    """Запросы к базе и время сериализации одного HTTP-запроса.
+
+    Вызывается из profile_execute на каждый запрос к базе.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.fingerprints = Counter()
+        self.serializer_time = 0.0
+        self.serializer_queries = 0
+        self.in_serializer = False
+
+    def __call__(self, execute, sql, params, many, context):
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += perf_counter() - started
+            self.queries += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    def get_duplicates(self):
+        """Повторяющиеся запросы — признак N+1."""
+        return [
+            {'sql': sql[:FINGERPRINT_MAX_LENGTH], 'count': count}
+            for sql, count in self.fingerprints.most_common(DUPLICATES_LIMIT)
+            if count > 1
+        ]
+
+
+def profile_execute(execute, sql, params, many, context):
+    """Обёртка соединений: запрос учитывается в профиле текущего запроса.
+
+    Профиль берётся из контекста, поэтому запросы из потоков
+    sync_to_async попадают в профиль того же HTTP-запроса.
+    """
+    profile = current_profile.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    return profile(execute, sql, params, many, context)
+
+
+class ProfiledSerializerMixin:
+    """Учитывает время сериализации в профиле запроса.
+
+    Считается только внешний вызов: вложенные сериализаторы и элементы
+    списка входят во время того, кто их вызвал.
+    """
+
+    def to_representation(self, instance):
+        profile = current_profile.get()
+        if profile is None or profile.in_serializer:
+            return super().to_representation(instance)
+        profile.in_serializer = True
+        queries = profile.queries
+        started = perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            profile.serializer_time += perf_counter() - started
+            profile.serializer_queries += profile.queries - queries
+            profile.in_serializer = False
@@ -1,17 +1,156 @@
 import base64
+import binascii
+from tempfile import SpooledTemporaryFile
 
-from django.core.files.base import ContentFile
+from django.conf import settings
+from django.core.files.base import File
+from django.core.files.storage import default_storage
+from PIL import Image, ImageFile
 from rest_framework import serializers
 
+from core.metrics import IMAGE_UPLOAD_BYTES
+
+BASE64_MARKER = ';base64,'
+BASE64_CHUNK_SIZE = 64 * 1024
+IMAGE_HEADER_MAX_BYTES = 256 * 1024
+IMAGE_SIGNATURES = {
+    'jpeg': (b'\xff\xd8\xff',),
+    'png': (b'\x89PNG\r\n\x1a\n',),
+    'gif': (b'GIF87a', b'GIF89a'),
+    'webp': (b'RIFF',),
+}
+
+
+def iter_base64(data, start):
+    """Декодирует data[start:] порциями, пропуская пробелы и переносы.
+
+    Остаток порции, не кратный четырём символам, переходит в следующую,
+    поэтому переносы строк не сбивают границы групп base64.
+    """
+    rest = ''
+    for position in range(start, len(data), BASE64_CHUNK_SIZE):
+        part = rest + ''.join(
+            data[position:position + BASE64_CHUNK_SIZE].split()
+        )
+        size = len(part) - len(part) % 4
+        part, rest = part[:size], part[size:]
+        if part:
+            yield base64.b64decode(part, validate=True)
+    if rest:
+        raise binascii.Error('Длина base64 не кратна четырём.')
+
 
 class Base64ImageField(serializers.ImageField):
-    """Кастомное поле для обработки изображений в формате Base64."""
+    """Кастомное поле для обработки изображений в формате Base64.
 
-    def to_internal_value(self, data: str):
-        if isinstance(data, str) and data.startswith('data:image'):
-            format, imgstr = data.split(';base64,')
-            ext = format.split('/')[-1]
+    Строка декодируется порциями прямо в загружаемый файл: небольшие
+    изображения остаются в памяти, крупные пишутся во временный файл.
+    Формат, объём и число пикселей проверяются до полного декодирования.
+    """
+
+    default_error_messages = {
+        'invalid_base64': 'Некорректное изображение в формате Base64.',
+        'unsupported_format': 'Формат изображения {format} не поддерживается.',
+        'format_mismatch': 'Содержимое не соответствует формату {format}.',
+        'too_large': 'Размер изображения превышает {max_bytes} байт.',
+        'too_many_pixels': 'Изображение больше {max_pixels} пикселей.',
+    }
 
-            data = ContentFile(base64.b64decode(imgstr), name='temp.' + ext)
+    def decode(self, data):
+        start = data.find(BASE64_MARKER, 0, 64)
+        if start == -1:
+            self.fail('invalid_base64')
+        extension = data[len('data:image/'):start].lower()
+        extension = 'jpeg' if extension == 'jpg' else extension
+        if extension not in IMAGE_SIGNATURES:
+            self.fail('unsupported_format', format=extension)
+        start += len(BASE64_MARKER)
+        max_bytes = settings.IMAGE_UPLOAD_MAX_BYTES
+        # Оценка сверху: переносы строк не входят в декодированный размер.
+        size = (len(data) - start - data.count('\n', start)
+                - data.count('\r', start)) * 3 // 4
+        if size > max_bytes:
+            self.fail('too_large', max_bytes=max_bytes)
+        upload = File(
+            SpooledTemporaryFile(
+                max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE
+            ),
+            name=f'temp.{extension}'
+        )
+        parser = ImageFile.Parser()
+        try:
+            for chunk in iter_base64(data, start):
+                if not upload.tell() and not chunk.startswith(
+                    IMAGE_SIGNATURES[extension]
+                ):
+                    self.fail('format_mismatch', format=extension)
+                if (parser.image is None
+                        and upload.tell() < IMAGE_HEADER_MAX_BYTES):
+                    # Parser читает только заголовок, пока не узнает размер.
+                    parser.feed(chunk)
+                    if (parser.image is not None
+                            and parser.image.width * parser.image.height
+                            > settings.IMAGE_UPLOAD_MAX_PIXELS):
+                        self.fail(
+                            'too_many_pixels',
+                            max_pixels=settings.IMAGE_UPLOAD_MAX_PIXELS
+                        )
+                upload.write(chunk)
+                if upload.tell() > max_bytes:
+                    self.fail('too_large', max_bytes=max_bytes)
+        except (binascii.Error, ValueError):
+            upload.close()
+            self.fail('invalid_base64')
+        except serializers.ValidationError:
+            upload.close()
+            raise
+        upload.size = upload.tell()
+        IMAGE_UPLOAD_BYTES.observe(upload.size)
+        upload.seek(0)
+        return upload
 
+    def verify(self, upload):
+        """Проверка изображения, как в ImageField, но без копии в памяти.
+
+        Django читает файл целиком в BytesIO; Pillow может читать
+        загруженный файл напрямую.
+        """
+        try:
+            image = Image.open(upload)
+            image.verify()
+        except Exception:
+            upload.close()
+            self.fail('invalid_image')
+        upload.image = image
+        upload.content_type = Image.MIME.get(image.format)
+        upload.seek(0)
+        return upload
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) and data.startswith('data:image'):
+            return self.verify(serializers.FileField.to_internal_value(
+                self, self.decode(data)
+            ))
         return super().to_internal_value(data)
+
+
+class ImageVariantsField(serializers.ReadOnlyField):
+    """Ссылки на уменьшенные копии изображения и размеры оригинала.
+
+    Пока копии не готовы, возвращает None.
+    """
+
+    def to_representation(self, variants):
+        if not variants:
+            return None
+        request = self.context.get('request')
+        representation = {
+            'width': variants['width'],
+            'height': variants['height'],
+        }
+        for name in settings.IMAGE_VARIANT_SIZES:
+            url = default_storage.url(variants[name])
+            representation[name] = (
+                request.build_absolute_uri(url) if request else url
+            )
+        return representation
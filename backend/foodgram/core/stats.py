@@ -0,0 +1,64 @@
+from core.metrics import CACHE_REQUESTS
+
+
+class CacheStats:
+    """Счётчики попаданий и промахов кеша процесса."""
+
+    registry = {}
+
+    def __init__(self, name):
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        CacheStats.registry[name] = self
+
+    def hit(self):
+        self.hits += 1
+        CACHE_REQUESTS.labels(self.name, 'hit').inc()
+
+    def miss(self):
+        self.misses += 1
+        CACHE_REQUESTS.labels(self.name, 'miss').inc()
+
+    @property
+    def hit_ratio(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def as_dict(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hit_ratio,
+        }
+
+
+class TimedCacheStats(CacheStats):
+    """Счётчики кеша с суммарным временем ответа при попадании и промахе."""
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.hit_time = 0.0
+        self.miss_time = 0.0
+
+    def hit(self, elapsed=0.0):
+        super().hit()
+        self.hit_time += elapsed
+
+    def miss(self, elapsed=0.0):
+        super().miss()
+        self.miss_time += elapsed
+
+    def as_dict(self):
+        return {
+            **super().as_dict(),
+            'hit_avg_ms': (1000 * self.hit_time / self.hits
+                           if self.hits else 0.0),
+            'miss_avg_ms': (1000 * self.miss_time / self.misses
+                            if self.misses else 0.0),
+        }
+
+
+def get_cache_stats():
+    return {name: stats.as_dict()
+            for name, stats in CacheStats.registry.items()}
@@ -0,0 +1,24 @@
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+
+
+def database_sync_to_async(func):
+    """Синхронная функция с ORM в пуле потоков для async-кода.
+
+    Django 3.2 выполняет thread_sensitive-вызовы в одном общем потоке,
+    поэтому синхронные представления под ASGI идут по очереди. Здесь
+    вызовы параллельны, а соединения потока закрываются и проверяются
+    так же, как сигналами начала и конца HTTP-запроса.
+    """
+
+    @wraps(func)
+    def run(*args, **kwargs):
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    return sync_to_async(run, thread_sensitive=False)
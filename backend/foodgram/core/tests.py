@@ -0,0 +1,118 @@
+import base64
+import os
+import threading
+import tracemalloc
+from io import BytesIO
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.cache import cache
+from django.http import StreamingHttpResponse
+from django.test import SimpleTestCase, override_settings
+from PIL import Image
+from rest_framework.exceptions import ValidationError
+
+from .cache import bump_version, get_version
+from .handlers import ASGIHandler
+from .serializers import Base64ImageField
+
+
+class VersionTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_bump_changes_version(self):
+        version = get_version('test')
+        self.assertEqual(get_version('test'), version)
+        bumped = bump_version('test')
+        self.assertNotEqual(bumped, version)
+        self.assertEqual(get_version('test'), bumped)
+
+    def test_lost_version_is_not_reused(self):
+        # Поколение, вытесненное из кеша, не возвращает старые записи.
+        version = get_version('test')
+        cache.clear()
+        self.assertNotEqual(get_version('test'), version)
+
+
+def make_base64_image(size, line_length=None):
+    """PNG из шума (почти не сжимается) в виде data URI."""
+    buffer = BytesIO()
+    Image.frombytes('RGB', size, os.urandom(size[0] * size[1] * 3)).save(
+        buffer, 'PNG', compress_level=0
+    )
+    encoded = base64.b64encode(buffer.getvalue()).decode()
+    if line_length:
+        encoded = '\n'.join(
+            encoded[position:position + line_length]
+            for position in range(0, len(encoded), line_length)
+        )
+    return buffer.getbuffer().nbytes, f'data:image/png;base64,{encoded}'
+
+
+class Base64ImageFieldTests(SimpleTestCase):
+
+    def test_line_breaks(self):
+        size, data = make_base64_image((300, 200), line_length=76)
+        upload = Base64ImageField().to_internal_value(data)
+        self.assertEqual(upload.size, size)
+        self.assertEqual(upload.image.size, (300, 200))
+
+    def test_format_mismatch(self):
+        _, data = make_base64_image((10, 10))
+        with self.assertRaises(ValidationError):
+            Base64ImageField().to_internal_value(
+                data.replace('image/png', 'image/jpeg', 1)
+            )
+
+    @override_settings(IMAGE_UPLOAD_MAX_PIXELS=100 * 100)
+    def test_too_many_pixels(self):
+        _, data = make_base64_image((200, 200))
+        with self.assertRaises(ValidationError):
+            Base64ImageField().to_internal_value(data)
+
+    def test_peak_memory(self):
+        # Изображение больше FILE_UPLOAD_MAX_MEMORY_SIZE уходит во временный
+        # файл: пик памяти не растёт с размером изображения. Запас на копию
+        # буфера при переходе SpooledTemporaryFile на диск.
+        size, data = make_base64_image((1600, 1600))
+        self.assertGreater(size, 2 * settings.FILE_UPLOAD_MAX_MEMORY_SIZE)
+        tracemalloc.start()
+        try:
+            upload = Base64ImageField().to_internal_value(data)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(upload.size, size)
+        self.assertLess(peak, 2 * settings.FILE_UPLOAD_MAX_MEMORY_SIZE)
+
+
+class ASGIHandlerTests(SimpleTestCase):
+
+    def test_streaming_parts_are_read_outside_event_loop(self):
+        read_threads = set()
+        loop_threads = set()
+
+        def parts():
+            for part in (b'first', b'second'):
+                read_threads.add(threading.get_ident())
+                yield part
+
+        messages = []
+
+        async def send(message):
+            loop_threads.add(threading.get_ident())
+            messages.append(message)
+
+        async_to_sync(ASGIHandler().send_response)(
+            StreamingHttpResponse(parts()), send
+        )
+        self.assertEqual(
+            [message.get('body') for message in messages[1:]],
+            [b'first', b'second', None]
+        )
+        # Все части — в одном потоке (серверный курсор), и не в цикле
+        # событий.
+        self.assertEqual(len(read_threads), 1)
+        self.assertFalse(read_threads & loop_threads)
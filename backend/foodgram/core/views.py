@@ -0,0 +1,9 @@
+from django.http import HttpResponse
+
+from core.metrics import render_metrics
+
+
+def metrics(request):
+    """Метрики всех воркеров для Prometheus."""
+    body, content_type = render_metrics()
+    return HttpResponse(body, content_type=content_type)
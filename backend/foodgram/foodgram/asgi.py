@@ -9,8 +9,15 @@ https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram.settings')
+os.environ.setdefault('ASYNC_VIEWS', 'True')
 
-application = get_asgi_application()
+# Как get_asgi_application(), но с обработчиком, который читает потоковые
+# ответы вне цикла событий.
+django.setup(set_prefix=False)
+
+from core.handlers import ASGIHandler  # noqa: E402
+
+application = ASGIHandler()
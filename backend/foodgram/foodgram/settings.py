@@ -1,3 +1,4 @@
+import json
 import os
 from pathlib import Path
 
@@ -11,7 +12,7 @@ load_dotenv(dotenv_path)
 
 SECRET_KEY = os.getenv('SECRET_KEY', get_random_secret_key())
 
-DEBUG = os.getenv('DEBUG', 'True')
+DEBUG = os.getenv('DEBUG', 'False') == 'True'
 
 ALLOWED_HOSTS = os.getenv('ALLOWED_HOSTS', '127.0.0.1, localhost').split(', ')
 
@@ -23,6 +24,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework.authtoken',
     'djoser',
@@ -42,6 +44,60 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True') == 'True'
+if METRICS_ENABLED:
+    MIDDLEWARE.insert(0, 'core.middleware.MetricsMiddleware')
+
+# Профилирование запросов к базе: Server-Timing, логи и бюджеты.
+QUERY_PROFILING = os.getenv('QUERY_PROFILING', 'False') == 'True'
+if QUERY_PROFILING:
+    MIDDLEWARE.insert(0, 'core.middleware.QueryProfilingMiddleware')
+
+# Допустимое число запросов к базе на действие; превышение — warning в лог.
+# По этим же бюджетам проверяет сценарии manage.py benchmark.
+QUERY_BUDGETS = {
+    'IngredientsViewSet.list': 1,
+    'IngredientsViewSet.retrieve': 1,
+    'TagsViewSet.list': 1,
+    'TagsViewSet.retrieve': 1,
+    'RecipeViewSet.list': 9,
+    'RecipeViewSet.retrieve': 7,
+    'RecipeViewSet.partial_update': 29,
+    'RecipeViewSet.favorite': 2,
+    'RecipeViewSet.shopping_cart': 2,
+    'RecipeViewSet.favorite_bulk': 4,
+    'RecipeViewSet.shopping_cart_bulk': 4,
+    'RecipeViewSet.download_shopping_cart': 2,
+    'RecipeViewSet.get_short_link': 1,
+    'UserViewSet.list': 3,
+    'UserViewSet.retrieve': 2,
+    'UserViewSet.me': 1,
+    'UserViewSet.subscriptions': 3,
+    'UserViewSet.subscribe': 7,
+    'TokenCreateView.post': 3,
+    # Запрос к базе — только для id новее индекса (recipes.short_links).
+    'get_redirect_short_link': 1,
+    'get_redirect_short_code': 1,
+    'aget_redirect_short_link': 1,
+    'aget_redirect_short_code': 1,
+}
+QUERY_BUDGETS.update(json.loads(os.getenv('QUERY_BUDGETS', '{}')))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'core.middleware': {
+            'handlers': ['console'],
+            'level': os.getenv('QUERY_PROFILING_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
+
 ROOT_URLCONF = 'foodgram.urls'
 
 TEMPLATES = [
@@ -62,18 +118,31 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'foodgram.wsgi.application'
 
+# Асинхронные представления горячих эндпоинтов; asgi.py включает их сам.
+ASYNC_VIEWS = os.getenv('ASYNC_VIEWS', 'False') == 'True'
+
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'core.db.backends.postgresql',
         'NAME': os.getenv('POSTGRES_DB', 'foodgram_db'),
         'USER': os.getenv('POSTGRES_USER', 'foodgram_user'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', 'foodgram_password'),
         'HOST': os.getenv('DB_HOST', 'db'),
-        'PORT': os.getenv('DB_PORT', 5432)
+        'PORT': os.getenv('DB_PORT', 5432),
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': os.getenv('DB_CONN_HEALTH_CHECKS', 'True') == 'True',
+        'OPTIONS': {},
     }
 }
 
+if os.getenv('DB_POOL', 'False') == 'True':
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'max_size': int(os.getenv('DB_POOL_MAX_SIZE', 10)),
+        'timeout': float(os.getenv('DB_POOL_TIMEOUT', 10)),
+        'max_idle': float(os.getenv('DB_POOL_MAX_IDLE', 300)),
+    }
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -96,6 +165,20 @@ STATIC_ROOT = BASE_DIR / 'collected_static'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / '/media/'
 
+# Тело запроса с изображением в base64, как client_max_body_size в nginx.
+DATA_UPLOAD_MAX_MEMORY_SIZE = int(
+    os.getenv('DATA_UPLOAD_MAX_MEMORY_SIZE', 10 * 1024 ** 2)
+)
+IMAGE_UPLOAD_MAX_BYTES = int(os.getenv('IMAGE_UPLOAD_MAX_BYTES', 10 * 1024 ** 2))
+IMAGE_UPLOAD_MAX_PIXELS = int(os.getenv('IMAGE_UPLOAD_MAX_PIXELS', 40_000_000))
+IMAGE_PROCESSING_WORKERS = int(os.getenv('IMAGE_PROCESSING_WORKERS', 2))
+IMAGE_VARIANT_FORMAT = os.getenv('IMAGE_VARIANT_FORMAT', 'WEBP')
+IMAGE_VARIANT_QUALITY = int(os.getenv('IMAGE_VARIANT_QUALITY', 80))
+IMAGE_VARIANT_SIZES = {
+    'thumb': (160, 160),
+    'card': (600, 600),
+}
+
 LANGUAGE_CODE = 'ru-RU'
 
 TIME_ZONE = 'Europe/Moscow'
@@ -111,6 +194,33 @@ STATIC_URL = '/static/'
 
 IMPORTING_FILES_DIR = os.path.join(BASE_DIR, 'data')
 
+INGREDIENT_SEARCH_LIMIT = int(os.getenv('INGREDIENT_SEARCH_LIMIT', 50))
+
+LOCAL_CACHE_BACKEND = 'django.core.cache.backends.locmem.LocMemCache'
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', LOCAL_CACHE_BACKEND),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    },
+}
+# LocMemCache у каждого воркера gunicorn свой, и сдвиг поколения данных
+# (core.cache) другие воркеры не видят. Поэтому с ним поколения живут
+# не дольше LOCAL_CACHE_TTL секунд; с общим кешем они бессрочны.
+CACHE_VERSION_TIMEOUT = (
+    int(os.getenv('LOCAL_CACHE_TTL', 30))
+    if CACHES['default']['BACKEND'] == LOCAL_CACHE_BACKEND else None
+)
+
+RESPONSE_CACHE_ALIAS = os.getenv('RESPONSE_CACHE_ALIAS', 'default')
+RESPONSE_CACHE_TIMEOUT = int(os.getenv('RESPONSE_CACHE_TIMEOUT', 300))
+
+AUTH_TOKEN_CACHE_ALIAS = os.getenv('AUTH_TOKEN_CACHE_ALIAS')
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv('AUTH_TOKEN_CACHE_SIZE', 1024))
+AUTH_TOKEN_CACHE_TTL = int(os.getenv('AUTH_TOKEN_CACHE_TTL', 30))
+
+MEMBERSHIP_CACHE_ALIAS = os.getenv('MEMBERSHIP_CACHE_ALIAS')
+MEMBERSHIP_CACHE_TIMEOUT = int(os.getenv('MEMBERSHIP_CACHE_TIMEOUT', 300))
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'users.User'
@@ -121,7 +231,7 @@ REST_FRAMEWORK = {
     ],
 
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'users.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
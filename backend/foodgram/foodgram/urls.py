@@ -1,8 +1,12 @@
 from django.contrib import admin
 from django.urls import include, path
 
+from core.views import metrics
+
 urlpatterns = [
     path('admin/', admin.site.urls),
+    # Внутренний адрес: nginx его наружу не проксирует.
+    path('metrics', metrics, name='metrics'),
     path('api/', include('api.urls')),
     path('', include('recipes.urls')),
 ]
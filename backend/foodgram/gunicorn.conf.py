@@ -0,0 +1,30 @@
+import os
+from pathlib import Path
+
+from prometheus_client import multiprocess
+
+# Как в core.metrics; приложение в мастер-процессе не импортируется,
+# чтобы он не создавал собственных файлов метрик.
+MULTIPROCESS_DIR_ENV = 'PROMETHEUS_MULTIPROC_DIR'
+
+# SERVER_MODE=asgi: воркеры uvicorn и асинхронные представления.
+if os.getenv('SERVER_MODE', 'wsgi') == 'asgi':
+    wsgi_app = 'foodgram.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+else:
+    wsgi_app = 'foodgram.wsgi:application'
+
+
+def on_starting(server):
+    """Очищает метрики прошлого запуска."""
+    directory = os.getenv(MULTIPROCESS_DIR_ENV)
+    if directory:
+        Path(directory).mkdir(parents=True, exist_ok=True)
+        for path in Path(directory).glob('*.db'):
+            path.unlink()
+
+
+def child_exit(server, worker):
+    """Убирает файлы живых метрик завершившегося воркера."""
+    if os.getenv(MULTIPROCESS_DIR_ENV):
+        multiprocess.mark_process_dead(worker.pid)
@@ -3,3 +3,41 @@ MIN_RECIPE_INGREDIENT_AMOUNT = 1
 MAX_LENGTH_TAG = 32
 MAX_LENGTH_INGREDIENT_NAME = 128
 MAX_LENGTH_MEASUREMENT_UNIT = 64
+# Коэффициенты пересчёта в каноническую единицу измерения.
+# Единицы, которых нет в таблице, не пересчитываются.
+UNIT_CONVERSIONS = {
+    'г': ('г', 1),
+    'кг': ('г', 1000),
+    'мг': ('г', 0.001),
+    'мл': ('мл', 1),
+    'л': ('мл', 1000),
+    'капля': ('мл', 0.05),
+    'ч. л.': ('мл', 5),
+    'ст. л.': ('мл', 15),
+    'стакан': ('мл', 250),
+}
+# Пересчёт, который зависит от ингредиента: штуки и объём сыпучих
+# продуктов в граммы. Имеет приоритет над UNIT_CONVERSIONS.
+INGREDIENT_UNIT_CONVERSIONS = {
+    ('мука', 'стакан'): ('г', 130),
+    ('мука', 'ст. л.'): ('г', 25),
+    ('мука', 'ч. л.'): ('г', 8),
+    ('сахар', 'стакан'): ('г', 200),
+    ('сахар', 'ст. л.'): ('г', 25),
+    ('сахар', 'ч. л.'): ('г', 8),
+    ('яйца куриные', 'шт.'): ('г', 55),
+    ('яйца перепелиные', 'шт.'): ('г', 12),
+}
+
+# Имена поколений данных в общем кеше (см. core.cache).
+INGREDIENTS_VERSION = 'ingredients'
+TAGS_VERSION = 'tags'
+RECIPES_VERSION = 'recipes'
+RECIPE_IDS_VERSION = 'recipe_ids'
+
+# Конфигурация полнотекстового поиска PostgreSQL.
+SEARCH_CONFIG = 'russian'
+
+SHORT_LINK_CODE_LENGTH = 6
+# Взаимно просто с числом кодов (52 * 62 ** 5): перестановка обратима.
+SHORT_LINK_MULTIPLIER = 2654435761
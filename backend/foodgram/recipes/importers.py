@@ -0,0 +1,21 @@
+from core.importing import Importer
+
+from .constants import INGREDIENTS_VERSION, RECIPES_VERSION, TAGS_VERSION
+from .models import Ingredients, Tag
+
+# Ингредиент ищется по названию, и у найденного обновляется единица
+# измерения. Уникально только сочетание названия и единицы
+# (unique_ingredient), поэтому ключ сопоставляется без ON CONFLICT.
+ingredients_importer = Importer(
+    Ingredients,
+    key_fields=('name',),
+    update_fields=('measurement_unit',),
+    versions=(INGREDIENTS_VERSION,),
+    unique_key=False
+)
+tags_importer = Importer(
+    Tag,
+    key_fields=('slug',),
+    update_fields=('name',),
+    versions=(TAGS_VERSION, RECIPES_VERSION)
+)
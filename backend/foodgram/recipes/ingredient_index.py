@@ -0,0 +1,72 @@
+from bisect import bisect_left
+from itertools import islice
+from threading import Lock
+
+from core.cache import get_version
+
+from .constants import INGREDIENTS_VERSION
+from .models import Ingredients
+
+
+class IngredientIndex:
+    """Индекс ингредиентов в памяти процесса для автодополнения.
+
+    Строится лениво при первом поиске и перестраивается, когда меняется
+    поколение INGREDIENTS_VERSION (его сдвигают сигналы модели Ingredients).
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._version = None
+        self._keys = []
+        self._entries = []
+
+    def build(self):
+        entries = sorted(
+            (name.lower(), ingredient_id, name, measurement_unit)
+            for ingredient_id, name, measurement_unit
+            in Ingredients.objects.values_list(
+                'id', 'name', 'measurement_unit'
+            ).order_by().iterator()
+        )
+        self._keys = [entry[0] for entry in entries]
+        self._entries = entries
+
+    def refresh(self):
+        version = get_version(INGREDIENTS_VERSION)
+        if version == self._version:
+            return
+        with self._lock:
+            if version != self._version:
+                self.build()
+                self._version = version
+
+    @staticmethod
+    def serialize(entry):
+        _, ingredient_id, name, measurement_unit = entry
+        return {
+            'id': ingredient_id,
+            'name': name,
+            'measurement_unit': measurement_unit,
+        }
+
+    def search(self, query, limit):
+        """Сначала совпадения по началу названия, затем по подстроке."""
+        self.refresh()
+        keys, entries = self._keys, self._entries
+        query = query.lower()
+        start = bisect_left(keys, query)
+        end = start
+        while end < len(keys) and keys[end].startswith(query):
+            end += 1
+        results = entries[start:min(end, start + limit)]
+        if len(results) < limit:
+            results.extend(islice(
+                (entry for index, entry in enumerate(entries)
+                 if not start <= index < end and query in entry[0]),
+                limit - len(results)
+            ))
+        return [self.serialize(entry) for entry in results]
+
+
+ingredient_index = IngredientIndex()
@@ -0,0 +1,126 @@
+import subprocess
+from contextlib import ExitStack
+from datetime import datetime
+
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+
+from core.benchmark.runner import (
+    SERVER_MODES,
+    find_budget_failures,
+    hold_slow_clients,
+    run_client,
+    run_gunicorn,
+    run_http,
+    write_report
+)
+from core.benchmark.scenarios import SCENARIOS, build_context
+from core.benchmark.seed import seed
+
+
+def get_commit():
+    try:
+        return subprocess.run(
+            ('git', 'rev-parse', '--short', 'HEAD'), cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    """Нагрузочный тест API с проверкой бюджета запросов к базе.
+
+    Результаты пишутся в JSON, чтобы сравнивать их между коммитами.
+    Команда завершается с ошибкой, если сценарий превысил бюджет.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', action='store_true',
+                            help='Пересоздать синтетические данные.')
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--recipes-per-user', type=int, default=20)
+        parser.add_argument('--cart-per-user', type=int, default=10,
+                            help='Рецептов в списке покупок пользователя.')
+        parser.add_argument('--iterations', type=int, default=20,
+                            help='Прогонов сценариев тестовым клиентом.')
+        parser.add_argument('--http', action='store_true',
+                            help='Также нагрузить локальный gunicorn.')
+        parser.add_argument(
+            '--server', choices=(*SERVER_MODES, 'both'), default='wsgi',
+            help='Режим gunicorn при --http; both сравнивает WSGI и ASGI.'
+        )
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Запросов на сценарий при --http.')
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument(
+            '--slow-clients', type=int, default=0,
+            help='Соединений, не дописывающих запрос, во время --http.'
+        )
+        parser.add_argument('--output', default='benchmark.json')
+
+    def handle(self, *args, **options):
+        report = {
+            'commit': get_commit(),
+            'started_at': datetime.now().isoformat(timespec='seconds'),
+            'options': {
+                name: options[name] for name in (
+                    'iterations', 'server', 'workers', 'requests',
+                    'concurrency', 'slow_clients'
+                )
+            },
+        }
+        if options['seed']:
+            report['dataset'] = seed(
+                users=options['users'],
+                recipes_per_user=options['recipes_per_user'],
+                cart_per_user=options['cart_per_user']
+            )
+            self.stdout.write(f'Данные созданы: {report["dataset"]}')
+        try:
+            context = build_context()
+        except ValueError as error:
+            raise CommandError(error)
+        report['client'] = run_client(SCENARIOS, context,
+                                      options['iterations'])
+        if options['http']:
+            report['http'] = {}
+            servers = (SERVER_MODES if options['server'] == 'both'
+                       else (options['server'],))
+            for server in servers:
+                with ExitStack() as stack:
+                    url = stack.enter_context(run_gunicorn(
+                        options['workers'], options['port'], server
+                    ))
+                    stack.enter_context(hold_slow_clients(
+                        options['port'], options['slow_clients']
+                    ))
+                    report['http'][server] = run_http(
+                        SCENARIOS, context, url, options['requests'],
+                        options['concurrency']
+                    )
+        report['budget_failures'] = find_budget_failures(report['client'])
+        write_report(report, options['output'])
+        for name, result in report['client'].items():
+            self.stdout.write(
+                '{name}: {queries}/{budget} запросов, p50 {p50_ms:.1f} мс, '
+                'p95 {p95_ms:.1f} мс, ошибок {errors}'.format(
+                    name=name, **result
+                )
+            )
+        for server, results in report.get('http', {}).items():
+            for name, result in results.items():
+                self.stdout.write(
+                    '{server} {name}: {rps:.0f} rps, p50 {p50_ms:.1f} мс, '
+                    'p99 {p99_ms:.1f} мс, ошибок {errors}'.format(
+                        server=server, name=name, **result
+                    )
+                )
+        self.stdout.write(f'Отчёт: {options["output"]}')
+        if report['budget_failures']:
+            raise CommandError('Превышен бюджет запросов: {}'.format(
+                ', '.join(failure['scenario']
+                          for failure in report['budget_failures'])
+            ))
@@ -0,0 +1,27 @@
+from django.core.management import BaseCommand
+
+from core.images import process_image
+from recipes.models import Recipe
+from users.models import User
+
+models_fields = (
+    (Recipe, 'image', 'image_variants'),
+    (User, 'avatar', 'avatar_variants'),
+)
+
+
+class Command(BaseCommand):
+    """Строит копии изображений, для которых их ещё нет."""
+
+    def handle(self, *args, **kwargs):
+        for model, field_name, variants_field in models_fields:
+            instances = model.objects.exclude(**{field_name: ''}).filter(
+                **{variants_field: {}}
+            )
+            processed = 0
+            for instance in instances.iterator():
+                process_image(instance, field_name, variants_field)
+                processed += 1
+            self.stdout.write(
+                f'{model._meta.verbose_name_plural}: обработано {processed}'
+            )
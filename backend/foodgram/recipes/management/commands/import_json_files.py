@@ -1,36 +1,26 @@
-import json
 import os
 
 from django.conf import settings
-from django.contrib.auth import get_user_model
-from django.core.management import BaseCommand
 
-from recipes.models import Ingredients, Tag
+from core.importing import BaseImportCommand, read_json
+from recipes.importers import ingredients_importer, tags_importer
 
-User = get_user_model()
-
-file_model = [
+file_importer = [
     {'file_name': 'ingredients.json',
-     'model': Ingredients},
+     'importer': ingredients_importer},
     {'file_name': 'tags.json',
-     'model': Tag}
+     'importer': tags_importer}
 ]
 
 
-class Command(BaseCommand):
+class Command(BaseImportCommand):
     """Класс загрузки базы данных ингредиентов."""
 
-    def load_data(self, file_name, model):
+    def load_data(self, file_name, importer, options):
         file_path = os.path.join(settings.IMPORTING_FILES_DIR,
                                  file_name)
-        with open(file_path, mode='r', encoding='utf-8') as file:
-            model.objects.bulk_create(
-                (model(**row) for row in json.load(file)),
-                ignore_conflicts=True
-            )
-
-        self.stdout.write(f'Успешно загружены данные из {file_path}')
+        self.import_rows(importer, read_json(file_path), file_path, options)
 
-    def handle(self, *args, **kwargs):
-        for args in file_model:
-            self.load_data(**args)
+    def handle(self, *args, **options):
+        for args in file_importer:
+            self.load_data(**args, options=options)
@@ -0,0 +1,23 @@
+from django.core.management import BaseCommand
+from django.db import transaction
+
+from core.counters import recount
+from recipes.models import (
+    Favorite,
+    Ingredients,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    Tag
+)
+from users.models import Subscription, User
+
+
+class Command(BaseCommand):
+    """Пересчитывает счётчики рецептов, ингредиентов, тегов и авторов."""
+
+    @transaction.atomic
+    def handle(self, *args, **kwargs):
+        recount(Recipe, Ingredients, Tag, User, RecipeIngredient, Favorite,
+                ShoppingCart, Subscription)
+        self.stdout.write('Счётчики пересчитаны')
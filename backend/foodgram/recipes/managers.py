@@ -0,0 +1,89 @@
+from django.db import connection, models, transaction
+
+from core.counters import change_counter
+
+# Рецепты из запроса, отмеченные флагом changed: строка добавлена
+# (или удалена) этим же запросом. Отсутствующих рецептов в выборке нет.
+CHANGE_RECIPES_SQL = '''
+WITH recipe AS (
+    SELECT {recipe_columns} FROM {recipe_table} WHERE id = ANY(%s)
+), changed AS (
+    {statement}
+)
+SELECT recipe.*, changed.recipe_id IS NOT NULL AS changed
+FROM recipe LEFT JOIN changed ON changed.recipe_id = recipe.id
+'''
+ADD_RECIPES_SQL = '''
+INSERT INTO {table} (author_id, recipe_id)
+SELECT %s, id FROM recipe
+ON CONFLICT DO NOTHING
+RETURNING recipe_id
+'''
+REMOVE_RECIPES_SQL = '''
+DELETE FROM {table}
+WHERE author_id = %s AND recipe_id IN (SELECT id FROM recipe)
+RETURNING recipe_id
+'''
+
+
+class CartOrFavoriteManager(models.Manager):
+    """Добавление и удаление рецептов одним запросом к базе.
+
+    Возвращает рецепты из запроса с атрибутом changed; по отсутствующим
+    в выборке id можно понять, что таких рецептов не существует.
+    """
+
+    recipe_fields = ('id', 'name', 'image', 'image_variants', 'cooking_time')
+
+    def change_recipes(self, statement, delta, author, recipe_ids):
+        recipe_model = self.model._meta.get_field('recipe').related_model
+        quote_name = connection.ops.quote_name
+        sql = CHANGE_RECIPES_SQL.format(
+            recipe_columns=', '.join(
+                quote_name(recipe_model._meta.get_field(field).column)
+                for field in self.recipe_fields
+            ),
+            recipe_table=quote_name(recipe_model._meta.db_table),
+            statement=statement.format(
+                table=quote_name(self.model._meta.db_table)
+            )
+        )
+        with transaction.atomic():
+            recipes = list(recipe_model.objects.raw(
+                sql, (list(recipe_ids), author.id)
+            ))
+            changed_ids = [recipe.id for recipe in recipes if recipe.changed]
+            if changed_ids:
+                # Сырой SQL не отправляет сигналы, счётчик меняется здесь.
+                change_counter(
+                    recipe_model.objects.filter(id__in=changed_ids),
+                    self.model.counter_field,
+                    delta
+                )
+        return recipes
+
+    def add_recipes(self, author, recipe_ids):
+        return self.change_recipes(ADD_RECIPES_SQL, 1, author, recipe_ids)
+
+    def remove_recipes(self, author, recipe_ids):
+        return self.change_recipes(REMOVE_RECIPES_SQL, -1, author,
+                                   recipe_ids)
+
+
+class RecipeIngredientManager(models.Manager):
+
+    def delete_rows(self, ids):
+        """Удаляет строки одним DELETE, без post_delete на каждую.
+
+        Счётчики ингредиентов, поисковый вектор и поколение рецептов
+        вызывающий код обновляет сам, один раз на всю операцию.
+        """
+        quote_name = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'DELETE FROM {} WHERE {} = ANY(%s)'.format(
+                    quote_name(self.model._meta.db_table),
+                    quote_name(self.model._meta.pk.column)
+                ),
+                (list(ids),)
+            )
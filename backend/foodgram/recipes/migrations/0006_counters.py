@@ -0,0 +1,62 @@
+# Generated by Django 3.2.3 on 2026-10-18 19:24
+
+from django.db import migrations, models
+
+# Снимок core.counters.recount на момент миграции: код приложения
+# может измениться, а миграция должна работать как прежде.
+FILL_COUNTERS_SQL = '''
+UPDATE recipes_recipe SET
+    favorites_count = (SELECT COUNT(*) FROM recipes_favorite
+                       WHERE recipe_id = recipes_recipe.id),
+    cart_count = (SELECT COUNT(*) FROM recipes_shoppingcart
+                  WHERE recipe_id = recipes_recipe.id);
+UPDATE recipes_ingredients SET
+    recipes_count = (SELECT COUNT(*) FROM recipes_recipeingredient
+                     WHERE ingredient_id = recipes_ingredients.id);
+UPDATE recipes_tag SET
+    recipes_count = (SELECT COUNT(*) FROM recipes_recipe_tags
+                     WHERE tag_id = recipes_tag.id);
+UPDATE users_user SET
+    recipes_count = (SELECT COUNT(*) FROM recipes_recipe
+                     WHERE author_id = users_user.id),
+    subscribers_count = (SELECT COUNT(*) FROM users_subscription
+                         WHERE author_id = users_user.id),
+    subscriptions_count = (SELECT COUNT(*) FROM users_subscription
+                           WHERE user_id = users_user.id);
+'''
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_image_variants'),
+        ('users', '0003_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredients',
+            name='recipes_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Рецептов'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='cart_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В списках покупок'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В избранном'),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='recipes_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Рецептов'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-favorites_count', '-created_at', '-id'], name='recipe_popular_idx'),
+        ),
+        migrations.RunSQL(FILL_COUNTERS_SQL, migrations.RunSQL.noop),
+    ]
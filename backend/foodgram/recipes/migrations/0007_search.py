@@ -0,0 +1,45 @@
+# Generated by Django 3.2.3 on 2026-10-18 19:50
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+# Снимок recipes.search.build_search_vector на момент миграции.
+FILL_SEARCH_VECTORS_SQL = '''
+UPDATE recipes_recipe SET search_vector =
+    setweight(to_tsvector('russian', COALESCE(name, '')), 'A')
+    || setweight(to_tsvector('russian', COALESCE((
+        SELECT STRING_AGG(ingredient.name, ' ')
+        FROM recipes_recipeingredient AS recipe_ingredient
+        JOIN recipes_ingredients AS ingredient
+            ON ingredient.id = recipe_ingredient.ingredient_id
+        WHERE recipe_ingredient.recipe_id = recipes_recipe.id
+    ), '')), 'B')
+    || setweight(to_tsvector('russian', COALESCE(text, '')), 'C');
+'''
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_counters'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Поисковый вектор'),
+        ),
+        migrations.RunSQL(FILL_SEARCH_VECTORS_SQL, migrations.RunSQL.noop),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='recipe_search_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name'], name='recipe_name_trgm_idx', opclasses=('gin_trgm_ops',)),
+        ),
+    ]
@@ -1,6 +1,11 @@
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator
 from django.db import models
+from django.db.models.functions import Upper
+
+from core.counters import CounterFieldsMixin
 
 from .constants import (
     MAX_LENGTH_INGREDIENT_NAME,
@@ -9,11 +14,14 @@ from .constants import (
     MIN_COOKING_TIME,
     MIN_RECIPE_INGREDIENT_AMOUNT
 )
+from .managers import CartOrFavoriteManager, RecipeIngredientManager
 
 User = get_user_model()
 
 
-class Tag(models.Model):
+class Tag(CounterFieldsMixin, models.Model):
+    counter_fields = ('recipes_count',)
+
     name = models.CharField(
         max_length=MAX_LENGTH_TAG,
         unique=True,
@@ -24,6 +32,11 @@ class Tag(models.Model):
         max_length=MAX_LENGTH_TAG,
         verbose_name='Слаг'
     )
+    recipes_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Рецептов'
+    )
 
     class Meta:
         verbose_name = 'Тег'
@@ -34,7 +47,9 @@ class Tag(models.Model):
         return self.name
 
 
-class Ingredients(models.Model):
+class Ingredients(CounterFieldsMixin, models.Model):
+    counter_fields = ('recipes_count',)
+
     name = models.CharField(
         max_length=MAX_LENGTH_INGREDIENT_NAME,
         verbose_name='Название'
@@ -43,6 +58,11 @@ class Ingredients(models.Model):
         max_length=MAX_LENGTH_MEASUREMENT_UNIT,
         verbose_name='Единица измерения'
     )
+    recipes_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Рецептов'
+    )
 
     class Meta:
         verbose_name = 'Ингредиент'
@@ -54,12 +74,20 @@ class Ingredients(models.Model):
                 name='unique_ingredient'
             ),
         )
+        indexes = (
+            # istartswith (^name в админке, фильтр name) — это
+            # UPPER(name) LIKE 'ПРЕФИКС%'.
+            models.Index(OpClass(Upper('name'), name='text_pattern_ops'),
+                         name='ingredient_name_upper_idx'),
+        )
 
     def __str__(self):
         return f'{self.name.capitalize()} - {self.measurement_unit}.'
 
 
-class Recipe(models.Model):
+class Recipe(CounterFieldsMixin, models.Model):
+    counter_fields = ('favorites_count', 'cart_count')
+
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -70,6 +98,9 @@ class Recipe(models.Model):
                             verbose_name='Название')
     image = models.ImageField(upload_to='recipes/',
                               verbose_name='Изображение')
+    image_variants = models.JSONField(default=dict, blank=True,
+                                      editable=False,
+                                      verbose_name='Копии изображения')
     text = models.TextField(verbose_name='Описание')
     ingredients = models.ManyToManyField(
         Ingredients,
@@ -90,11 +121,44 @@ class Recipe(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True,
                                       verbose_name='Время создания рецепта')
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='В избранном'
+    )
+    cart_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='В списках покупок'
+    )
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+        verbose_name='Поисковый вектор'
+    )
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
         ordering = ('-created_at',)
+        indexes = (
+            models.Index(
+                fields=('-created_at', '-id'),
+                name='recipe_created_at_id_idx'
+            ),
+            models.Index(
+                fields=('-favorites_count', '-created_at', '-id'),
+                name='recipe_popular_idx'
+            ),
+            GinIndex(fields=('search_vector',), name='recipe_search_idx'),
+            GinIndex(
+                fields=('name',),
+                name='recipe_name_trgm_idx',
+                opclasses=('gin_trgm_ops',)
+            ),
+            models.Index(OpClass(Upper('name'), name='text_pattern_ops'),
+                         name='recipe_name_upper_idx'),
+        )
 
 
 class RecipeIngredient(models.Model):
@@ -117,6 +181,8 @@ class RecipeIngredient(models.Model):
         ),),
         verbose_name='Количество',)
 
+    objects = RecipeIngredientManager()
+
     class Meta:
         verbose_name = 'Ингредиент в рецепте'
         verbose_name_plural = 'Ингредиенты в рецепте'
@@ -141,6 +207,8 @@ class BaseCartOrFavorite(models.Model):
         verbose_name='Рецепт'
     )
 
+    objects = CartOrFavoriteManager()
+
     class Meta:
         abstract = True
         constraints = (
@@ -152,6 +220,8 @@ class BaseCartOrFavorite(models.Model):
 
 
 class Favorite(BaseCartOrFavorite):
+    # Счётчик рецепта, который меняется вместе с записями модели.
+    counter_field = 'favorites_count'
 
     class Meta(BaseCartOrFavorite.Meta):
         verbose_name = 'Избранный рецепт'
@@ -160,6 +230,7 @@ class Favorite(BaseCartOrFavorite):
 
 
 class ShoppingCart(BaseCartOrFavorite):
+    counter_field = 'cart_count'
 
     class Meta(BaseCartOrFavorite.Meta):
         verbose_name = 'Рецепт из корзины'
@@ -0,0 +1,82 @@
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.lookups import PostgresOperatorLookup
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector
+)
+from django.db.models import (
+    CharField,
+    F,
+    FloatField,
+    Func,
+    OuterRef,
+    Q,
+    Subquery,
+    Value
+)
+
+from .constants import SEARCH_CONFIG
+
+
+@CharField.register_lookup
+class TrigramWordSimilar(PostgresOperatorLookup):
+    """name__trigram_word_similar=text: text похож на одно из слов name.
+
+    Есть в Django 4.0; similarity() сравнивает запрос со всем названием,
+    и опечатка в одном слове длинного названия не набирает порога.
+    """
+
+    lookup_name = 'trigram_word_similar'
+    postgres_operator = '%%>'
+
+
+class TrigramWordSimilarity(Func):
+    function = 'WORD_SIMILARITY'
+    output_field = FloatField()
+
+    def __init__(self, string, expression, **extra):
+        super().__init__(Value(string), expression, **extra)
+
+
+def build_search_vector(recipe_ingredient):
+    """Поисковый вектор рецепта: название, ингредиенты и описание.
+
+    Веса A, B, C поднимают в выдаче совпадения в названии выше
+    совпадений в описании.
+    """
+    ingredient_names = Subquery(
+        recipe_ingredient.objects.filter(
+            recipe=OuterRef('pk')
+        ).order_by().values('recipe').annotate(
+            names=StringAgg('ingredient__name', ' ')
+        ).values('names')
+    )
+    return (
+        SearchVector('name', weight='A', config=SEARCH_CONFIG)
+        + SearchVector(ingredient_names, weight='B', config=SEARCH_CONFIG)
+        + SearchVector('text', weight='C', config=SEARCH_CONFIG)
+    )
+
+
+def update_search_vectors(recipes):
+    """Пересчитывает search_vector у рецептов queryset одним UPDATE."""
+    recipe_ingredient = recipes.model._meta.get_field(
+        'recipe_ingredients'
+    ).related_model
+    recipes.update(search_vector=build_search_vector(recipe_ingredient))
+
+
+def search_recipes(recipes, text):
+    """Полнотекстовый поиск с ранжированием.
+
+    Запрос с опечаткой не находит лемм, поэтому подходят и рецепты,
+    в названии которых есть похожее на запрос по триграммам слово.
+    """
+    query = SearchQuery(text, config=SEARCH_CONFIG, search_type='websearch')
+    return recipes.filter(
+        Q(search_vector=query) | Q(name__trigram_word_similar=text)
+    ).annotate(
+        rank=SearchRank(F('search_vector'), query)
+        + TrigramWordSimilarity(text, 'name')
+    ).order_by('-rank', '-created_at', '-id')
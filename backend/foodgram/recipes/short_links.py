@@ -0,0 +1,131 @@
+from string import ascii_letters, digits
+from threading import Lock
+
+from core.cache import get_version
+
+from .constants import (
+    RECIPE_IDS_VERSION,
+    SHORT_LINK_CODE_LENGTH,
+    SHORT_LINK_MULTIPLIER
+)
+from .models import Recipe
+
+# Первый символ кода — буква, поэтому коды не пересекаются
+# со старыми ссылками вида /s/<id>/.
+FIRST_ALPHABET = ascii_letters
+ALPHABET = digits + ascii_letters
+CODES_COUNT = len(FIRST_ALPHABET) * len(ALPHABET) ** (
+    SHORT_LINK_CODE_LENGTH - 1
+)
+SHORT_LINK_INVERSE = pow(SHORT_LINK_MULTIPLIER, -1, CODES_COUNT)
+# Младшие разряды произведения зависят только от младших разрядов id,
+# поэтому между умножениями разряды переставляются по кругу.
+ROTATION = len(ALPHABET) ** 3
+ROUNDS = 2
+
+
+def permute(value):
+    for _ in range(ROUNDS):
+        value = value * SHORT_LINK_MULTIPLIER % CODES_COUNT
+        high, low = divmod(value, ROTATION)
+        value = low * (CODES_COUNT // ROTATION) + high
+    return value
+
+
+def unpermute(value):
+    for _ in range(ROUNDS):
+        low, high = divmod(value, CODES_COUNT // ROTATION)
+        value = high * ROTATION + low
+        value = value * SHORT_LINK_INVERSE % CODES_COUNT
+    return value
+
+
+def encode_id(recipe_id):
+    """Короткий код рецепта: обратимая перестановка id в base62.
+
+    Код вычисляется, а не хранится, поэтому для рецепта он всегда один
+    и тот же, а соседние id получают непохожие коды.
+    """
+    if not 0 < recipe_id < CODES_COUNT:
+        raise ValueError(f'id={recipe_id} вне диапазона коротких ссылок.')
+    value = permute(recipe_id)
+    chars = []
+    for _ in range(SHORT_LINK_CODE_LENGTH - 1):
+        value, index = divmod(value, len(ALPHABET))
+        chars.append(ALPHABET[index])
+    chars.append(FIRST_ALPHABET[value])
+    return ''.join(reversed(chars))
+
+
+def decode_code(code):
+    """id рецепта по коду или None, если код некорректен."""
+    if (len(code) != SHORT_LINK_CODE_LENGTH
+            or code[0] not in FIRST_ALPHABET
+            or any(char not in ALPHABET for char in code[1:])):
+        return None
+    value = FIRST_ALPHABET.index(code[0])
+    for char in code[1:]:
+        value = value * len(ALPHABET) + ALPHABET.index(char)
+    return unpermute(value) or None
+
+
+class RecipeIdIndex:
+    """Битовая карта id существующих рецептов в памяти процесса.
+
+    Строится лениво и перестраивается, когда меняется поколение
+    RECIPE_IDS_VERSION (его сдвигают создание и удаление рецептов).
+    Другие воркеры с LocMemCache видят сдвиг только через LOCAL_CACHE_TTL,
+    поэтому id больше максимального в карте проверяются по базе:
+    так только что созданный рецепт находится сразу.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._version = None
+        self._bitmap = bytearray()
+        self._max_id = 0
+
+    def build(self):
+        ids = list(Recipe.objects.values_list('id', flat=True).order_by())
+        max_id = max(ids, default=0)
+        bitmap = bytearray((max_id >> 3) + 1)
+        for recipe_id in ids:
+            bitmap[recipe_id >> 3] |= 1 << (recipe_id & 7)
+        self._bitmap = bitmap
+        self._max_id = max_id
+
+    def refresh(self):
+        version = get_version(RECIPE_IDS_VERSION)
+        if version == self._version:
+            return
+        with self._lock:
+            if version != self._version:
+                self.build()
+                self._version = version
+
+    def add(self, recipe_id):
+        with self._lock:
+            bitmap = self._bitmap
+            if recipe_id >> 3 >= len(bitmap):
+                bitmap = bitmap + bytearray(
+                    (recipe_id >> 3) + 1 - len(bitmap)
+                )
+            bitmap[recipe_id >> 3] |= 1 << (recipe_id & 7)
+            self._bitmap = bitmap
+            self._max_id = max(self._max_id, recipe_id)
+
+    def contains(self, recipe_id):
+        self.refresh()
+        bitmap = self._bitmap
+        if (0 <= recipe_id >> 3 < len(bitmap)
+                and bitmap[recipe_id >> 3] & 1 << (recipe_id & 7)):
+            return True
+        if recipe_id <= self._max_id:
+            return False
+        if not Recipe.objects.filter(pk=recipe_id).exists():
+            return False
+        self.add(recipe_id)
+        return True
+
+
+recipe_ids = RecipeIdIndex()
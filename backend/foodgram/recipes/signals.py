@@ -0,0 +1,134 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete
+)
+from django.dispatch import receiver
+
+from core.cache import bump_version_on_commit
+from core.counters import change_counter
+from core.images import schedule_image_variants, variants_saved
+
+from .constants import (
+    INGREDIENTS_VERSION,
+    RECIPE_IDS_VERSION,
+    RECIPES_VERSION,
+    TAGS_VERSION
+)
+from .models import (
+    Favorite,
+    Ingredients,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    Tag
+)
+from .search import update_search_vectors
+
+User = get_user_model()
+
+M2M_COUNTER_DELTAS = {'post_add': 1, 'post_remove': -1, 'pre_clear': -1}
+
+
+@receiver((post_save, post_delete), sender=Ingredients)
+def ingredients_changed(**kwargs):
+    bump_version_on_commit(INGREDIENTS_VERSION)
+    bump_version_on_commit(RECIPES_VERSION)
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def tags_changed(**kwargs):
+    bump_version_on_commit(TAGS_VERSION)
+    bump_version_on_commit(RECIPES_VERSION)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(instance, **kwargs):
+    schedule_image_variants(instance, 'image', 'image_variants')
+    bump_version_on_commit(RECIPES_VERSION)
+
+
+@receiver(post_delete, sender=Recipe)
+@receiver((post_save, post_delete), sender=RecipeIngredient)
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(variants_saved, sender=Recipe)
+def recipes_changed(**kwargs):
+    bump_version_on_commit(RECIPES_VERSION)
+
+
+@receiver((post_save, post_delete), sender=Favorite)
+@receiver((post_save, post_delete), sender=ShoppingCart)
+def cart_or_favorite_changed(sender, instance, signal, created=False,
+                             **kwargs):
+    if signal is post_save and not created:
+        return
+    change_counter(Recipe.objects.filter(pk=instance.recipe_id),
+                   sender.counter_field, 1 if created else -1)
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+def recipe_counters_changed(instance, signal, created=False, **kwargs):
+    if signal is post_save and not created:
+        return
+    change_counter(User.objects.filter(pk=instance.author_id),
+                   'recipes_count', 1 if created else -1)
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+def recipe_ids_changed(signal, created=False, **kwargs):
+    if signal is post_delete or created:
+        bump_version_on_commit(RECIPE_IDS_VERSION)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_search_changed(instance, **kwargs):
+    update_search_vectors(Recipe.objects.filter(pk=instance.pk))
+
+
+@receiver((post_save, post_delete), sender=RecipeIngredient)
+def recipe_ingredient_search_changed(instance, **kwargs):
+    update_search_vectors(Recipe.objects.filter(pk=instance.recipe_id))
+
+
+@receiver(post_save, sender=Ingredients)
+def ingredient_search_changed(instance, created=False, **kwargs):
+    if not created:
+        update_search_vectors(Recipe.objects.filter(
+            id__in=RecipeIngredient.objects.filter(
+                ingredient=instance
+            ).values('recipe_id')
+        ))
+
+
+@receiver(pre_delete, sender=Recipe)
+def recipe_deleting(instance, **kwargs):
+    # Каскадное удаление связей с тегами не отправляет m2m_changed.
+    change_counter(Tag.objects.filter(recipes=instance), 'recipes_count', -1)
+
+
+@receiver((post_save, post_delete), sender=RecipeIngredient)
+def recipe_ingredient_counters_changed(instance, signal, created=False,
+                                       **kwargs):
+    if signal is post_save and not created:
+        return
+    change_counter(Ingredients.objects.filter(pk=instance.ingredient_id),
+                   'recipes_count', 1 if created else -1)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_counters_changed(instance, action, reverse, pk_set,
+                                 **kwargs):
+    delta = M2M_COUNTER_DELTAS.get(action)
+    if delta is None:
+        return
+    if action == 'pre_clear':
+        related = instance.recipes if reverse else instance.tags
+        pk_set = set(related.values_list('pk', flat=True))
+    if reverse:
+        change_counter(Tag.objects.filter(pk=instance.pk),
+                       'recipes_count', delta * len(pk_set))
+    else:
+        change_counter(Tag.objects.filter(pk__in=pk_set),
+                       'recipes_count', delta)
@@ -0,0 +1,34 @@
+from threading import Lock
+
+from core.cache import get_version
+
+from .constants import TAGS_VERSION
+from .models import Tag
+
+
+class TagSlugs:
+    """Соответствие slug -> id тегов в памяти процесса.
+
+    Перечитывается из базы, когда меняется поколение TAGS_VERSION.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._version = None
+        self._ids = {}
+
+    def get_ids(self):
+        version = get_version(TAGS_VERSION)
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    self._ids = dict(Tag.objects.values_list('slug', 'id'))
+                    self._version = version
+        return self._ids
+
+
+tag_slugs = TagSlugs()
+
+
+def get_tag_choices():
+    return [(slug, slug) for slug in tag_slugs.get_ids()]
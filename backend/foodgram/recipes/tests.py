@@ -0,0 +1,285 @@
+import json
+import os
+from io import StringIO
+from tempfile import TemporaryDirectory
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from core.cache import get_version
+from users.models import User
+
+from .constants import INGREDIENTS_VERSION, TAGS_VERSION
+from .models import Ingredients, Recipe, RecipeIngredient, Tag
+from .short_links import CODES_COUNT, encode_id
+from .units import normalize_ingredients
+
+
+def row(name, unit, amount):
+    return {'ingredient__name': name, 'ingredient__measurement_unit': unit,
+            'amount': amount}
+
+
+class NormalizeIngredientsTests(SimpleTestCase):
+
+    def test_units_are_merged(self):
+        self.assertEqual(
+            list(normalize_ingredients([
+                row('молоко', 'л', 1), row('молоко', 'мл', 200),
+                row('мука', 'г', 500), row('мука', 'кг', 1),
+            ])),
+            [row('молоко', 'мл', 1200), row('мука', 'г', 1500)]
+        )
+
+    def test_single_unit_is_kept(self):
+        self.assertEqual(
+            list(normalize_ingredients([row('соль', 'ч. л.', 2)])),
+            [row('соль', 'ч. л.', 2)]
+        )
+
+    def test_ingredient_conversion(self):
+        # Стакан муки пересчитывается в граммы, а не в миллилитры.
+        self.assertEqual(
+            list(normalize_ingredients([
+                row('мука', 'г', 100), row('мука', 'стакан', 2),
+                row('яйца куриные', 'г', 50),
+                row('яйца куриные', 'шт.', 2),
+            ])),
+            [row('мука', 'г', 360), row('яйца куриные', 'г', 160)]
+        )
+
+    def test_unknown_units_are_not_merged(self):
+        self.assertEqual(
+            list(normalize_ingredients([
+                row('лук', 'г', 100), row('лук', 'головка', 1),
+            ])),
+            [row('лук', 'г', 100), row('лук', 'головка', 1)]
+        )
+
+
+class CatalogVersionTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def assertBumpedOnCommit(self, version_name, change):
+        version = get_version(version_name)
+        with self.captureOnCommitCallbacks(execute=True):
+            change()
+            # До коммита читатели не должны кешировать старые строки
+            # под новым поколением.
+            self.assertEqual(get_version(version_name), version)
+        self.assertNotEqual(get_version(version_name), version)
+
+    def test_tag_change(self):
+        self.assertBumpedOnCommit(TAGS_VERSION, lambda: Tag.objects.create(
+            name='Завтрак', slug='breakfast'
+        ))
+
+    def test_ingredient_change(self):
+        self.assertBumpedOnCommit(
+            INGREDIENTS_VERSION,
+            lambda: Ingredients.objects.create(name='соль',
+                                               measurement_unit='г')
+        )
+
+
+class ImportTests(TestCase):
+
+    def setUp(self):
+        directory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        settings = override_settings(IMPORTING_FILES_DIR=self.directory)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def write(self, file_name, content):
+        with open(os.path.join(self.directory, file_name), mode='w',
+                  encoding='utf-8') as file:
+            file.write(content)
+
+    def import_csv(self, content, *args):
+        self.write('ingredients.csv', content)
+        stdout = StringIO()
+        call_command('import_ingredients', *args, stdout=stdout)
+        return stdout.getvalue()
+
+    def import_json(self, content, *args):
+        self.write('ingredients.json', content)
+        self.write('tags.json', '[]')
+        stdout = StringIO()
+        call_command('import_json_files', *args, stdout=stdout)
+        return stdout.getvalue()
+
+    def units(self):
+        return dict(Ingredients.objects.values_list('name',
+                                                    'measurement_unit'))
+
+    def test_csv_inserts_and_updates_units(self):
+        self.assertIn('добавлено 2, обновлено 0, пропущено 0',
+                      self.import_csv('соль,г\nсахар,г\n'))
+        self.assertIn('добавлено 0, обновлено 1, пропущено 1',
+                      self.import_csv('соль,г\nсахар,кг\n'))
+        self.assertEqual(self.units(), {'соль': 'г', 'сахар': 'кг'})
+
+    def test_duplicate_rows(self):
+        # В одной пачке побеждает последняя строка, в разных каждая
+        # следующая обновляет предыдущую.
+        self.assertIn('добавлено 1, обновлено 0, пропущено 1',
+                      self.import_csv('соль,г\nсоль,кг\n'))
+        self.assertIn('добавлено 0, обновлено 2, пропущено 0',
+                      self.import_csv('соль,г\nсоль,кг\n',
+                                      '--batch-size', '1'))
+        self.assertEqual(self.units(), {'соль': 'кг'})
+
+    def test_ambiguous_name_is_skipped(self):
+        for unit in ('г', 'головка'):
+            Ingredients.objects.create(name='лук', measurement_unit=unit)
+        self.assertIn('добавлено 0, обновлено 0, пропущено 1',
+                      self.import_csv('лук,шт\n'))
+        self.assertEqual(Ingredients.objects.filter(name='лук').count(), 2)
+
+    def test_json_malformed_rows_are_skipped(self):
+        output = self.import_json(json.dumps([
+            {'name': 'соль', 'measurement_unit': 'г'},
+            {'name': 'перец'},
+            {'name': ' ', 'measurement_unit': 'г'},
+            5,
+        ]))
+        self.assertIn('добавлено 1, обновлено 0, пропущено 3', output)
+        self.assertEqual(self.units(), {'соль': 'г'})
+
+    def test_broken_json_keeps_written_batches(self):
+        with self.assertRaises(json.JSONDecodeError):
+            self.import_json(
+                '[{"name": "соль", "measurement_unit": "г"}, {"name": ',
+                '--batch-size', '1'
+            )
+        self.assertEqual(self.units(), {'соль': 'г'})
+
+    def test_dry_run(self):
+        output = self.import_csv('соль,г\n', '--dry-run')
+        self.assertIn('[dry-run]', output)
+        self.assertIn('добавлено 1', output)
+        self.assertFalse(Ingredients.objects.exists())
+
+
+class ShortLinkTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            email='author@example.com', username='author',
+            first_name='author', last_name='author',
+            password='password-1234'
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def create_recipe(self):
+        return Recipe.objects.create(
+            author=self.author, name='Рецепт', text='Описание',
+            cooking_time=10, image='recipes/test.png'
+        )
+
+    def get_link(self, recipe_id):
+        return self.client.get(
+            reverse('recipe:recipe-short-link', args=(encode_id(recipe_id),))
+        )
+
+    def test_new_recipe_before_index_refresh(self):
+        recipe = self.create_recipe()
+        self.assertEqual(self.get_link(recipe.id).status_code, 302)
+        # Поколение сдвигается только после коммита, как в другом воркере,
+        # который ещё не увидел сдвиг: индекс устарел.
+        new_recipe = self.create_recipe()
+        with self.assertNumQueries(1):
+            response = self.get_link(new_recipe.id)
+        self.assertRedirects(response, f'/recipes/{new_recipe.id}/',
+                             fetch_redirect_response=False)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get_link(new_recipe.id).status_code, 302)
+
+    def test_missing_recipe(self):
+        recipe = self.create_recipe()
+        self.assertEqual(self.get_link(recipe.id).status_code, 302)
+        self.assertEqual(self.get_link(CODES_COUNT - 1).status_code, 404)
+
+
+class AdminChangelistTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            email='admin@example.com', username='admin', first_name='admin',
+            last_name='admin', password='password-1234'
+        )
+        cls.tags = [Tag.objects.create(name=f'Тег {number}',
+                                       slug=f'tag-{number}')
+                    for number in range(2)]
+        cls.ingredients = [
+            Ingredients.objects.create(name=f'ингредиент {number}',
+                                       measurement_unit='г')
+            for number in range(2)
+        ]
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def add_recipes(self, count):
+        for number in range(count):
+            recipe = Recipe.objects.create(
+                author=self.admin, name=f'Рецепт {number}', text='Описание',
+                cooking_time=10, image='recipes/test.png'
+            )
+            recipe.tags.set(self.tags)
+            for ingredient in self.ingredients:
+                RecipeIngredient.objects.create(
+                    recipe=recipe, ingredient=ingredient, amount=1
+                )
+
+    def assertChangelistQueries(self, url, count, params=None):
+        # Число запросов не зависит от числа строк на странице.
+        for recipes in (1, 5):
+            self.add_recipes(recipes)
+            with self.subTest(recipes=recipes), self.assertNumQueries(count):
+                response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+
+    def test_recipe_changelist(self):
+        # Сессия, пользователь, варианты фильтров по автору и тегам,
+        # COUNT с фильтром и без, страница, теги, строки ингредиентов
+        # и сами ингредиенты.
+        self.assertChangelistQueries(
+            reverse('admin:recipes_recipe_changelist'), 10
+        )
+
+    def test_recipe_search(self):
+        # Плюс поиск автора по имени пользователя.
+        self.assertChangelistQueries(
+            reverse('admin:recipes_recipe_changelist'), 11, {'q': 'рец'}
+        )
+
+    def test_recipe_search_by_author_username(self):
+        self.add_recipes(2)
+        Recipe.objects.create(
+            author=User.objects.create_user(
+                email='cook@example.com', username='cook', first_name='cook',
+                last_name='cook', password='password-1234'
+            ),
+            name='Суп', text='Описание', cooking_time=10,
+            image='recipes/test.png'
+        )
+        response = self.client.get(
+            reverse('admin:recipes_recipe_changelist'), {'q': 'admin'}
+        )
+        self.assertEqual(response.context['cl'].result_count, 2)
+
+    def test_ingredient_changelist(self):
+        self.assertChangelistQueries(
+            reverse('admin:recipes_ingredients_changelist'), 6, {'q': 'инг'}
+        )
@@ -0,0 +1,59 @@
+from functools import lru_cache
+from itertools import groupby
+
+from .constants import INGREDIENT_UNIT_CONVERSIONS, UNIT_CONVERSIONS
+
+
+@lru_cache(maxsize=None)
+def get_conversion(name, measurement_unit):
+    """Каноническая единица и коэффициент пересчёта для ингредиента.
+
+    Сначала ищется пересчёт для этого ингредиента, затем общий для
+    единицы. Результат кешируется: пар (название, единица) не больше,
+    чем строк в справочнике ингредиентов.
+    """
+    unit = ' '.join(measurement_unit.lower().replace('.', '. ').split())
+    return INGREDIENT_UNIT_CONVERSIONS.get(
+        (name.lower(), unit),
+        UNIT_CONVERSIONS.get(unit, (measurement_unit, 1))
+    )
+
+
+def format_amount(amount):
+    amount = round(amount, 2)
+    if amount == int(amount):
+        return int(amount)
+    return amount
+
+
+def normalize_ingredients(ingredients):
+    """Объединяет строки одного ингредиента в разных единицах измерения.
+
+    Ожидает строки вида {'ingredient__name', 'ingredient__measurement_unit',
+    'amount'}, отсортированные по названию ингредиента. Строки обходятся
+    один раз, в памяти держится только группа одного ингредиента, поэтому
+    генератор можно подавать прямо в потоковый ответ.
+    """
+    for name, rows in groupby(
+        ingredients, key=lambda row: row['ingredient__name']
+    ):
+        groups = {}
+        for row in rows:
+            unit = row['ingredient__measurement_unit']
+            amounts = groups.setdefault(get_conversion(name, unit)[0], {})
+            amounts[unit] = amounts.get(unit, 0) + row['amount']
+        for canonical_unit, amounts in groups.items():
+            if len(amounts) == 1:
+                # Единица одна — оставляем её как есть, без пересчёта.
+                (unit, amount), = amounts.items()
+            else:
+                unit = canonical_unit
+                amount = sum(
+                    value * get_conversion(name, key)[1]
+                    for key, value in amounts.items()
+                )
+            yield {
+                'ingredient__name': name,
+                'ingredient__measurement_unit': unit,
+                'amount': format_amount(amount),
+            }
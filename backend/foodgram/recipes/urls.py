@@ -1,12 +1,26 @@
-from django.urls import path
+from django.conf import settings
+from django.urls import path, re_path
 
-from .views import get_redirect_short_link
+from .views import (
+    aget_redirect_short_code,
+    aget_redirect_short_link,
+    get_redirect_short_code,
+    get_redirect_short_link
+)
 
 app_name = 'recipe'
 
 urlpatterns = [
     path(
-        's/<int:pk>/', get_redirect_short_link,
+        's/<int:pk>/',
+        aget_redirect_short_link if settings.ASYNC_VIEWS
+        else get_redirect_short_link,
         name='recipe-redirect'
     ),
+    re_path(
+        r'^s/(?P<code>[A-Za-z][0-9A-Za-z]{5})/$',
+        aget_redirect_short_code if settings.ASYNC_VIEWS
+        else get_redirect_short_code,
+        name='recipe-short-link'
+    ),
 ]
@@ -1,10 +1,39 @@
+from django.http import Http404
 from django.shortcuts import redirect
-from rest_framework.serializers import ValidationError
 
-from .models import Recipe
+from core.sync import database_sync_to_async
 
+from .short_links import decode_code, recipe_ids
 
-def get_redirect_short_link(request, pk):
-    if Recipe.objects.filter(id=pk).exists():
+
+def get_short_link_response(pk, exists):
+    if exists:
         return redirect(f'/recipes/{pk}/')
-    raise ValidationError(f'Рецепта с id={pk} не существует.')
+    raise Http404('Рецепт не найден.')
+
+
+def get_redirect_short_link(request, pk):
+    """Старые ссылки вида /s/<id>/."""
+    return get_short_link_response(pk, recipe_ids.contains(pk))
+
+
+def get_redirect_short_code(request, code):
+    pk = decode_code(code)
+    return get_short_link_response(
+        pk, pk is not None and recipe_ids.contains(pk)
+    )
+
+
+async def aget_redirect_short_link(request, pk):
+    """Вариант для ASGI: индекс может обратиться к кешу и базе."""
+    return get_short_link_response(
+        pk, await database_sync_to_async(recipe_ids.contains)(pk)
+    )
+
+
+async def aget_redirect_short_code(request, code):
+    pk = decode_code(code)
+    return get_short_link_response(
+        pk, pk is not None
+        and await database_sync_to_async(recipe_ids.contains)(pk)
+    )
@@ -20,23 +20,23 @@ class UserAdmin(UserAdmin):
         'subscribers'
     )
     list_filter = (UserHasRecipes, UserHasSubscribers, UserHasSubscriptions)
-    search_fields = ('first_name', 'last_name', 'username', 'email',)
+    search_fields = ('^username', '^email',)
 
     @display(description='Имя фамилия')
     def get_full_name(self, user):
         return f'{user.first_name} {user.last_name}'
 
-    @display(description='Рецептов')
+    @display(description='Рецептов', ordering='recipes_count')
     def recipes_wrote(self, user):
-        return user.recipes.count()
+        return user.recipes_count
 
-    @display(description='Подписок')
+    @display(description='Подписок', ordering='subscriptions_count')
     def number_of_subscriptions(self, user):
-        return user.subscribers.count()
+        return user.subscriptions_count
 
-    @display(description='Подписчиков')
+    @display(description='Подписчиков', ordering='subscribers_count')
     def subscribers(self, user):
-        return user.authors.count()
+        return user.subscribers_count
 
     @display(description='Изображение')
     def get_avatar(self, user):
@@ -50,3 +50,4 @@ class UserAdmin(UserAdmin):
 @admin.register(Subscription)
 class SubscriptionAdmin(admin.ModelAdmin):
     list_display = ('user', 'author',)
+    list_select_related = ('user', 'author',)
@@ -0,0 +1,123 @@
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework.authentication import TokenAuthentication
+
+from core.cache import bump_version_on_commit, get_version
+from core.stats import CacheStats
+
+from .constants import TOKEN_CACHE_FIELDS, TOKEN_VERSION
+
+TOKEN_CACHE_KEY = 'auth_token:{}'
+
+User = get_user_model()
+
+token_stats = CacheStats('auth_tokens')
+
+
+class TokenCache:
+    """LRU снимков пользователей по ключу токена с коротким TTL.
+
+    За локальным словарём может стоять общий кеш AUTH_TOKEN_CACHE_ALIAS.
+    Снимок — значения полей TOKEN_CACHE_FIELDS; при каждом обращении из
+    него собирается новый экземпляр, поэтому запросы не делят один объект.
+
+    Снимок действителен, пока не сдвинулось поколение токена в общем
+    кеше (core.cache): так выход и смена пароля доходят до всех воркеров
+    сразу. Если CACHE_BACKEND у каждого воркера свой, другие воркеры
+    узнают об этом не позже чем через AUTH_TOKEN_CACHE_TTL секунд.
+    """
+
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.lock = Lock()
+
+    @property
+    def shared_cache(self):
+        if settings.AUTH_TOKEN_CACHE_ALIAS:
+            return caches[settings.AUTH_TOKEN_CACHE_ALIAS]
+        return None
+
+    @staticmethod
+    def get_version(key):
+        return get_version(TOKEN_VERSION.format(key))
+
+    def get(self, key, version):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and entry[0] > monotonic() and entry[1] == version:
+                self.entries.move_to_end(key)
+                return entry[2]
+            self.entries.pop(key, None)
+        if self.shared_cache is None:
+            return None
+        entry = self.shared_cache.get(TOKEN_CACHE_KEY.format(key))
+        if entry is None or entry[0] != version:
+            return None
+        self.remember(key, *entry)
+        return entry[1]
+
+    def remember(self, key, version, snapshot):
+        with self.lock:
+            self.entries[key] = (
+                monotonic() + settings.AUTH_TOKEN_CACHE_TTL, version, snapshot
+            )
+            self.entries.move_to_end(key)
+            while len(self.entries) > settings.AUTH_TOKEN_CACHE_SIZE:
+                self.entries.popitem(last=False)
+
+    def set(self, key, version, snapshot):
+        self.remember(key, version, snapshot)
+        if self.shared_cache is not None:
+            self.shared_cache.set(TOKEN_CACHE_KEY.format(key),
+                                  (version, snapshot),
+                                  timeout=settings.AUTH_TOKEN_CACHE_TTL)
+
+    def delete(self, *keys):
+        for key in keys:
+            bump_version_on_commit(TOKEN_VERSION.format(key))
+        with self.lock:
+            for key in keys:
+                self.entries.pop(key, None)
+        if self.shared_cache is not None:
+            self.shared_cache.delete_many(
+                [TOKEN_CACHE_KEY.format(key) for key in keys]
+            )
+
+
+token_cache = TokenCache()
+
+
+def make_snapshot(user):
+    return tuple(getattr(user, field) for field in TOKEN_CACHE_FIELDS)
+
+
+def restore_user(snapshot):
+    return User.from_db(DEFAULT_DB_ALIAS, TOKEN_CACHE_FIELDS, snapshot)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication без запроса к базе для недавних токенов.
+
+    Кеш сбрасывается сигналами при удалении токена и сохранении
+    пользователя.
+    """
+
+    def authenticate_credentials(self, key):
+        # Поколение читается до базы: сдвиг во время запроса не даст
+        # закешировать уже устаревший снимок.
+        version = token_cache.get_version(key)
+        snapshot = token_cache.get(key, version)
+        if snapshot is not None:
+            token_stats.hit()
+            user = restore_user(snapshot)
+            return user, self.get_model()(key=key, user=user)
+        token_stats.miss()
+        user, token = super().authenticate_credentials(key)
+        token_cache.set(key, version, make_snapshot(user))
+        return user, token
@@ -1 +1,11 @@
 FILTERS_LOOKUPS = [('yes', 'да'), ('no', 'нет')]
+
+# Поля пользователя, которые API читает у request.user. Пароль и прочие
+# поля в кеш токенов не попадают и при обращении загружаются из базы.
+TOKEN_CACHE_FIELDS = (
+    'id', 'email', 'username', 'first_name', 'last_name', 'avatar',
+    'avatar_variants', 'is_active', 'is_staff', 'is_superuser',
+)
+# Поколение токена в общем кеше: сдвигается при выходе и изменении
+# пользователя, чтобы другие воркеры забыли свои снимки.
+TOKEN_VERSION = 'auth_token:{}'
@@ -21,16 +21,16 @@ class BaseHasRecipes(admin.SimpleListFilter):
 class UserHasRecipes(BaseHasRecipes):
     title = 'Есть рецепты'
     parameter_name = 'has_recipe'
-    filter_arg = {'recipes': None}
+    filter_arg = {'recipes_count': 0}
 
 
 class UserHasSubscriptions(BaseHasRecipes):
     title = 'Есть подписки'
     parameter_name = 'has_subscriptions'
-    filter_arg = {'subscribers': None}
+    filter_arg = {'subscriptions_count': 0}
 
 
 class UserHasSubscribers(BaseHasRecipes):
     title = 'Есть подписчики'
     parameter_name = 'has_subscribers'
-    filter_arg = {'authors': None}
+    filter_arg = {'subscribers_count': 0}
@@ -1,9 +1,16 @@
 from django.contrib.auth.models import AbstractUser
 from django.contrib.auth.validators import UnicodeUsernameValidator
+from django.contrib.postgres.indexes import OpClass
 from django.db import models
+from django.db.models.functions import Upper
 
+from core.counters import CounterFieldsMixin
 
-class User(AbstractUser):
+
+class User(CounterFieldsMixin, AbstractUser):
+    counter_fields = (
+        'recipes_count', 'subscribers_count', 'subscriptions_count'
+    )
     USERNAME_FIELD = 'email'
 
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name']
@@ -23,11 +30,39 @@ class User(AbstractUser):
         blank=True,
         help_text=('Аватар')
     )
+    avatar_variants = models.JSONField(
+        verbose_name='Копии аватара',
+        default=dict,
+        blank=True,
+        editable=False
+    )
+    recipes_count = models.PositiveIntegerField(
+        verbose_name='Рецептов',
+        default=0,
+        editable=False
+    )
+    subscribers_count = models.PositiveIntegerField(
+        verbose_name='Подписчиков',
+        default=0,
+        editable=False
+    )
+    subscriptions_count = models.PositiveIntegerField(
+        verbose_name='Подписок',
+        default=0,
+        editable=False
+    )
 
     class Meta:
         verbose_name = 'Пользователь'
         verbose_name_plural = 'Пользователи'
         ordering = ('date_joined',)
+        indexes = (
+            # Поиск в админке по началу строки: UPPER(поле) LIKE 'ПРЕФИКС%'.
+            models.Index(OpClass(Upper('username'), name='text_pattern_ops'),
+                         name='user_username_upper_idx'),
+            models.Index(OpClass(Upper('email'), name='text_pattern_ops'),
+                         name='user_email_upper_idx'),
+        )
 
 
 class Subscription(models.Model):
@@ -0,0 +1,50 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from core.cache import bump_version_on_commit
+from core.counters import change_counter
+from core.images import schedule_image_variants, variants_saved
+from recipes.constants import RECIPES_VERSION
+
+from .authentication import token_cache
+from .models import Subscription, User
+
+# Поля пользователя, которые не попадают в ответы API рецептов.
+USER_PRIVATE_FIELDS = frozenset(('last_login', 'password'))
+
+
+@receiver(post_save, sender=User)
+def user_saved(instance, update_fields=None, **kwargs):
+    schedule_image_variants(instance, 'avatar', 'avatar_variants')
+    if update_fields is None or not USER_PRIVATE_FIELDS.issuperset(
+        update_fields
+    ):
+        bump_version_on_commit(RECIPES_VERSION)
+    if update_fields is None or update_fields != {'last_login'}:
+        # Пароль, активность и профиль берутся из снимка в кеше токенов.
+        token_cache.delete(*Token.objects.filter(
+            user=instance
+        ).values_list('key', flat=True))
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(instance, **kwargs):
+    token_cache.delete(instance.key)
+
+
+@receiver(variants_saved, sender=User)
+def avatar_variants_saved(**kwargs):
+    bump_version_on_commit(RECIPES_VERSION)
+
+
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=Subscription)
+def subscription_changed(instance, signal, created=False, **kwargs):
+    if signal is post_save and not created:
+        return
+    delta = 1 if created else -1
+    change_counter(User.objects.filter(pk=instance.author_id),
+                   'subscribers_count', delta)
+    change_counter(User.objects.filter(pk=instance.user_id),
+                   'subscriptions_count', delta)
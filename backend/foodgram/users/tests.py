@@ -0,0 +1,80 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from .authentication import token_cache
+from .models import User
+
+REQUESTS_COUNT = 20
+
+
+class CachedTokenAuthenticationTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='user@example.com', username='user', first_name='user',
+            last_name='user', password='password-1234'
+        )
+        cls.token = Token.objects.create(user=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        token_cache.entries.clear()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def get_me(self):
+        return self.client.get(reverse('user-me'))
+
+    def test_token_is_looked_up_once(self):
+        # Нагрузка на /api/users/me/: токен с пользователем читается из базы
+        # только при первом запросе, дальше — по запросу подписок на ответ.
+        with self.assertNumQueries(2):
+            self.get_me()
+        with self.assertNumQueries(REQUESTS_COUNT):
+            for _ in range(REQUESTS_COUNT):
+                self.assertEqual(self.get_me().status_code, 200)
+
+    def test_snapshot_has_no_password(self):
+        self.get_me()
+        _, _, snapshot = token_cache.entries[self.token.key]
+        self.assertNotIn(self.user.password, snapshot)
+
+    def test_logout_in_another_worker(self):
+        self.get_me()
+        # Другой воркер: его локальный снимок сигнал удаления не трогает.
+        entries = token_cache.entries.copy()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.token.delete()
+        token_cache.entries.update(entries)
+        self.assertEqual(self.get_me().status_code, 401)
+
+    def test_deactivation(self):
+        self.get_me()
+        self.user.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        self.assertEqual(self.get_me().status_code, 401)
+
+
+class AdminChangelistTests(TestCase):
+
+    def test_user_changelist(self):
+        admin = User.objects.create_superuser(
+            email='admin@example.com', username='admin', first_name='admin',
+            last_name='admin', password='password-1234'
+        )
+        self.client.force_login(admin)
+        url = reverse('admin:users_user_changelist')
+        for users in (1, 5):
+            for number in range(users):
+                User.objects.create_user(
+                    email=f'user{users}{number}@example.com',
+                    username=f'user{users}{number}', password='password-1234'
+                )
+            # Сессия, пользователь, COUNT с поиском и без и страница.
+            with self.subTest(users=users), self.assertNumQueries(5):
+                response = self.client.get(url, {'q': 'user'})
+            self.assertEqual(response.status_code, 200)